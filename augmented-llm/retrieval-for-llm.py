@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 import requests
 import json
 
+from session_store import SessionStore
+
 load_dotenv()
 
 client = AzureOpenAI(
@@ -40,15 +42,16 @@ tools = [
     }
 ]
 
-messages = [
-    {"role": "system", "content": "You are a helpful assistant that answers questions from the knowledge base about our e-commerce store."},
-    {"role": "user", "content": "What is the return policy?"},
-]
+# history lives in a compact session store; the system prompt and tool schema
+# are shared by every session instead of copied into each history
+sessions = SessionStore()
+session = sessions.create("You are a helpful assistant that answers questions from the knowledge base about our e-commerce store.", tools)
+session.append({"role": "user", "content": "What is the return policy?"})
 
 completion = client.chat.completions.create(
     model=os.getenv("AZURE_DEPLOYMENT_NAME"),
-    messages=messages,
-    tools=tools,
+    messages=session.to_api(),
+    tools=session.tools,
 )
 
 # print(completion.choices[0].message) 
@@ -62,14 +65,14 @@ def call_function(name, args):
 for tool_call in completion.choices[0].message.tool_calls:
     name = tool_call.function.name
     args = json.loads(tool_call.function.arguments)
-    messages.append(completion.choices[0].message)
+    session.append(completion.choices[0].message)
 
     result = call_function(name, args)
-    messages.append(
+    session.append(
         {"role": "tool", "tool_call_id": tool_call.id, "content": json.dumps(result)}
     )
 
-# print(messages)
+# print(session.to_api())
 # [{'role': 'system', 'content': 'You are a helpful assistant that answers questions from the knowledge base about our e-commerce store.'}, {'role': 'user', 'content': 'What is the return policy?'}, ChatCompletionMessage(content=None, refusal=None, role='assistant', audio=None, function_call=None, tool_calls=[ChatCompletionMessageToolCall(id='call_c00LKLMDtc7z7DXqlOUpvxeN', function=Function(arguments='{"question":"What is the return policy?"}', name='search_kb'), type='function')]), {'role': 'tool', 'tool_call_id': 'call_c00LKLMDtc7z7DXqlOUpvxeN', 'content': '{"records": [{"id": 1, "question": "What is the return policy?", "answer": "Items can be returned within 30 days of purchase with original receipt. Refunds will be processed to the original payment method within 5-7 business days."}, {"id": 2, "question": "Do you ship internationally?", "answer": "Yes, we ship to over 50 countries worldwide. International shipping typically takes 7-14 business days and costs vary by destination. Please note that customs fees may apply."}, {"id": 3, "question": "What payment methods do you accept?", "answer": "We accept Visa, Mastercard, American Express, PayPal, and Apple Pay. All payments are processed securely through our encrypted payment system."}]}'}]
 
 class KBResponse(BaseModel):
@@ -78,8 +81,8 @@ class KBResponse(BaseModel):
 
 completion_2 = client.beta.chat.completions.parse(
     model=os.getenv("AZURE_DEPLOYMENT_NAME"),
-    messages=messages,
-    tools=tools,
+    messages=session.to_api(),
+    tools=session.tools,
     response_format=KBResponse,
 )
 
@@ -0,0 +1,114 @@
+# ------------------------------------------------------------------------------
+# Benchmark: Bytes per Session, Plain History vs SessionStore
+# ------------------------------------------------------------------------------
+
+# Builds the same tool-calling conversation as tools-for-llm.py for many
+# concurrent sessions, once the way the scripts keep history today (list of
+# dicts + ChatCompletionMessage, system prompt and tools per session) and once
+# in SessionStore (see session_store.py), and reports bytes per session before
+# and after. Prompts and tool schemas are rebuilt per session on the plain
+# side, as they would be when a server assembles each request.
+
+
+from openai.types.chat import ChatCompletionMessage
+import copy
+import json
+import logging
+import tempfile
+import time
+
+from session_store import SessionStore, deep_sizeof
+
+# Set up logging configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+SESSIONS = 20_000
+
+system_prompt = "You are a helpful weather assistant."
+tools = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_weather",
+            "description": "Get current temperature for provided coordinates in celsius.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "latitude": {"type": "number"},
+                    "longitude": {"type": "number"},
+                },
+                "required": ["latitude", "longitude"],
+                "additionalProperties": False,
+            },
+            "strict": True,
+        },
+    }
+]
+weather = json.dumps({"time": "2025-03-04T14:00", "interval": 900, "temperature_2m": 11.3, "wind_speed_10m": 9.4})
+
+def conversation(i: int) -> list:
+    """One tool-calling exchange, shaped like tools-for-llm.py"""
+    assistant = ChatCompletionMessage.model_validate(
+        {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_{i:024d}",
+                    "type": "function",
+                    "function": {"name": "get_weather", "arguments": '{"latitude":48.8566,"longitude":2.3522}'},
+                }
+            ],
+        }
+    )
+    return [
+        {"role": "user", "content": f"What's the weather like in Paris today? (session {i})"},
+        assistant,
+        {"role": "tool", "tool_call_id": f"call_{i:024d}", "content": weather[:1] + weather[1:]},
+    ]
+
+# plain history
+
+start = time.perf_counter()
+plain_sessions = []
+for i in range(SESSIONS):
+    messages = [{"role": "system", "content": system_prompt[:1] + system_prompt[1:]}] + conversation(i)
+    plain_sessions.append({"messages": messages, "tools": copy.deepcopy(tools)})
+plain_seconds = time.perf_counter() - start
+plain_bytes = deep_sizeof(plain_sessions) / SESSIONS
+
+# session store
+
+with tempfile.TemporaryDirectory() as spill_dir:
+    store = SessionStore(spill_dir=spill_dir, max_idle_seconds=60)
+    start = time.perf_counter()
+    session_ids = []
+    for i in range(SESSIONS):
+        session = store.create(system_prompt[:1] + system_prompt[1:], copy.deepcopy(tools))
+        for message in conversation(i):
+            session.append(message)
+        session_ids.append(session.id)
+    store_seconds = time.perf_counter() - start
+    store_bytes = store.bytes_per_session()
+
+    # the API format is only built when needed, and must match the plain history
+    assert store.get(session_ids[0]).to_api()[-1] == plain_sessions[0]["messages"][-1]
+
+    # evict half of the sessions as idle and bring one back
+    for session_id in session_ids[: SESSIONS // 2]:
+        store.get(session_id).last_active -= 3600
+    start = time.perf_counter()
+    evicted = store.evict_idle()
+    evict_seconds = time.perf_counter() - start
+    reloaded = store.get(session_ids[0])
+    assert len(reloaded.to_api()) == len(plain_sessions[0]["messages"])
+
+print(f"plain history:  {plain_bytes:8,.0f} bytes/session  (built in {plain_seconds:.2f}s)")
+print(f"session store:  {store_bytes:8,.0f} bytes/session  (built in {store_seconds:.2f}s)")
+print(f"reduction:      {(1 - store_bytes / plain_bytes) * 100:.1f}%")
+print(f"evicted {evicted} idle sessions in {evict_seconds:.2f}s, {len(store)} still in memory")
@@ -0,0 +1,241 @@
+# ------------------------------------------------------------------------------
+# Compact Session Store for Many Concurrent Conversations
+# ------------------------------------------------------------------------------
+
+# The tool scripts keep history as a list of dicts and ChatCompletionMessage
+# objects, with the system prompt and tool schema repeated in every session.
+# Here:
+#
+# - system prompts, tool definitions and repeated tool results are interned,
+#   so every session points at one shared copy
+# - messages are __slots__ objects holding a role code and plain strings /
+#   tuples instead of dicts or pydantic models
+# - the API format (list of dicts) is only built when a request is sent
+# - idle sessions are written to disk and reloaded on the next access
+
+
+from collections import OrderedDict
+from typing import Any, Optional
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("system", "user", "assistant", "tool")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# helpers
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Bytes held by obj and everything it references, each object counted once per seen set"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+class Interner:
+    """Share one copy of repeated strings and tool definitions"""
+
+    def __init__(self, max_results: int = 10_000):
+        self._strings: dict[str, str] = {}
+        self._tools: dict[str, list] = {}
+        self._results: OrderedDict[str, str] = OrderedDict()  # bounded, tool output is open-ended
+        self.max_results = max_results
+
+    def string(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def tools(self, tools: Optional[list]) -> Optional[list]:
+        if not tools:
+            return None
+        key = json.dumps(tools, sort_keys=True)
+        return self._tools.setdefault(key, tools)
+
+    def result(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        shared = self._results.get(value)
+        if shared is not None:
+            self._results.move_to_end(value)
+            return shared
+        self._results[value] = value
+        if len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        return value
+
+# data model
+
+class Message:
+    """One chat message in compact form"""
+
+    __slots__ = ("role", "content", "tool_call_id", "tool_calls")
+
+    def __init__(self, role: int, content: Optional[str], tool_call_id: Optional[str] = None, tool_calls: Optional[tuple] = None):
+        self.role = role
+        self.content = content
+        self.tool_call_id = tool_call_id
+        self.tool_calls = tool_calls  # ((id, name, arguments), ...)
+
+    @classmethod
+    def from_api(cls, message: Any, interner: Interner) -> "Message":
+        """Accept a dict or a ChatCompletionMessage"""
+        if isinstance(message, dict):
+            role, content = message["role"], message.get("content")
+            tool_call_id, raw_calls = message.get("tool_call_id"), message.get("tool_calls")
+        else:
+            role, content = message.role, message.content
+            tool_call_id, raw_calls = None, message.tool_calls
+
+        tool_calls = None
+        if raw_calls:
+            tool_calls = tuple(
+                (call["id"], interner.string(call["function"]["name"]), call["function"]["arguments"])
+                if isinstance(call, dict)
+                else (call.id, interner.string(call.function.name), call.function.arguments)
+                for call in raw_calls
+            )
+        if role == "system":
+            content = interner.string(content)
+        elif role == "tool":
+            content = interner.result(content)
+        return cls(_ROLE_CODES[role], content, tool_call_id, tool_calls)
+
+    def to_api(self) -> dict:
+        message = {"role": ROLES[self.role], "content": self.content}
+        if self.tool_call_id is not None:
+            message["tool_call_id"] = self.tool_call_id
+        if self.tool_calls:
+            message["tool_calls"] = [
+                {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+                for call_id, name, arguments in self.tool_calls
+            ]
+        return message
+
+    def to_row(self) -> list:
+        return [self.role, self.content, self.tool_call_id, [list(call) for call in self.tool_calls or ()]]
+
+
+class Session:
+    """Conversation history sharing its system prompt and tools with other sessions"""
+
+    __slots__ = ("id", "system_prompt", "tools", "messages", "last_active", "_interner")
+
+    def __init__(self, session_id: str, system_prompt: Optional[str], tools: Optional[list], interner: Interner):
+        self.id = session_id
+        self.system_prompt = system_prompt
+        self.tools = tools
+        self.messages: list[Message] = []
+        self.last_active = time.monotonic()
+        self._interner = interner
+
+    def append(self, message: Any):
+        """Add a dict or ChatCompletionMessage to the history"""
+        self.messages.append(Message.from_api(message, self._interner))
+        self.last_active = time.monotonic()
+
+    def to_api(self) -> list[dict]:
+        """Messages in the format chat.completions expects, built on demand"""
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt is not None else []
+        messages.extend(message.to_api() for message in self.messages)
+        return messages
+
+# store
+
+class SessionStore:
+    """Live sessions in memory, idle ones spilled to disk"""
+
+    def __init__(self, spill_dir: str = ".sessions", max_idle_seconds: float = 600.0):
+        self.spill_dir = spill_dir
+        self.max_idle_seconds = max_idle_seconds
+        self.interner = Interner()
+        self._sessions: dict[str, Session] = {}
+        self.evicted = 0
+        self.reloaded = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, system_prompt: Optional[str] = None, tools: Optional[list] = None, session_id: Optional[str] = None) -> Session:
+        session = Session(
+            session_id or uuid.uuid4().hex,
+            self.interner.string(system_prompt),
+            self.interner.tools(tools),
+            self.interner,
+        )
+        self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> Session:
+        """Live session, reloaded from disk if it was evicted"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._reload(session_id)
+        session.last_active = time.monotonic()
+        return session
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Write sessions idle longer than max_idle_seconds to disk and drop them from memory"""
+        now = time.monotonic() if now is None else now
+        idle = [s for s in self._sessions.values() if now - s.last_active > self.max_idle_seconds]
+        if not idle:
+            return 0
+        os.makedirs(self.spill_dir, exist_ok=True)
+        for session in idle:
+            with open(self._path(session.id), "w") as f:
+                json.dump(
+                    {
+                        "system_prompt": session.system_prompt,
+                        "tools": session.tools,
+                        "messages": [message.to_row() for message in session.messages],
+                    },
+                    f,
+                )
+            del self._sessions[session.id]
+        self.evicted += len(idle)
+        logger.info(f"Evicted {len(idle)} idle sessions to {self.spill_dir}")
+        return len(idle)
+
+    def bytes_per_session(self) -> float:
+        """Average memory per live session, shared strings and tools counted once"""
+        if not self._sessions:
+            return 0.0
+        seen = {id(self.interner)}  # the interner itself is shared, not per-session
+        return deep_sizeof(list(self._sessions.values()), seen) / len(self._sessions)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{session_id}.json")
+
+    def _reload(self, session_id: str) -> Session:
+        path = self._path(session_id)
+        with open(path) as f:
+            data = json.load(f)
+        session = self.create(data["system_prompt"], data["tools"], session_id=session_id)
+        for role, content, tool_call_id, tool_calls in data["messages"]:
+            content = self.interner.result(content) if role == _ROLE_CODES["tool"] else content
+            calls = tuple((i, self.interner.string(n), a) for i, n, a in tool_calls) or None
+            session.messages.append(Message(role, content, tool_call_id, calls))
+        os.remove(path)
+        self.reloaded += 1
+        return session
@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 import requests
 import json
 
+from session_store import SessionStore
+
 load_dotenv()
 
 client = AzureOpenAI(
@@ -41,15 +43,16 @@ tools = [
     }
 ]
 
-messages = [
-    {"role": "system", "content": "You are a helpful weather assistant."},
-    {"role": "user", "content": "What's the weather like in Paris today?"},
-]
+# history lives in a compact session store; the system prompt and tool schema
+# are shared by every session instead of copied into each history
+sessions = SessionStore()
+session = sessions.create("You are a helpful weather assistant.", tools)
+session.append({"role": "user", "content": "What's the weather like in Paris today?"})
 
 completion = client.chat.completions.create(
     model=os.getenv("AZURE_DEPLOYMENT_NAME"),
-    messages=messages,
-    tools=tools,
+    messages=session.to_api(),
+    tools=session.tools,
 )
 
 #print(completion)
@@ -77,10 +80,10 @@ def call_function(name, args):
 for tool_call in completion.choices[0].message.tool_calls:
     name = tool_call.function.name
     args = json.loads(tool_call.function.arguments)
-    messages.append(completion.choices[0].message)
+    session.append(completion.choices[0].message)
 
     result = call_function(name, args) # this is just an api call - no AI involved 
-    messages.append(
+    session.append(
         {"role": "tool", "tool_call_id": tool_call.id, "content": json.dumps(result)}
     )
 
@@ -94,8 +97,8 @@ class WeatherResponse(BaseModel):
 
 completion_2 = client.beta.chat.completions.parse(
     model=os.getenv("AZURE_DEPLOYMENT_NAME"),
-    messages=messages,
-    tools=tools,
+    messages=session.to_api(),
+    tools=session.tools,
     response_format=WeatherResponse,
 )
 
@@ -0,0 +1,163 @@
+# ------------------------------------------------------------------------------
+# Benchmark: Online Routing Calls vs Offline Bulk Mode
+# ------------------------------------------------------------------------------
+
+# Re-classifies the same workload of calendar requests with the router prompt
+# from routing-pattern.py, once through per-request online calls (bounded
+# concurrency, like a nightly loop over route_calendar_request) and once as a
+# Batch API job (see batch_mode.py), both against one local stand-in
+# deployment, and reports:
+#
+#   - token cost, with the batch discount applied to the bulk run
+#   - how many results were parsed and joined back by custom_id
+#   - throughput (requests/s) and wall time, with the same number of
+#     requests in flight on both paths
+#
+# The throughput numbers are synthetic: the stand-in works batches off right
+# away, while a real batch job can take anywhere up to its 24h completion
+# window. Only the cost comparison and the join carry over as-is.
+
+
+from typing import Literal
+from pydantic import BaseModel, Field
+from openai import AsyncAzureOpenAI, AzureOpenAI
+import asyncio
+import json
+import logging
+import random
+import time
+
+from batch_mode import run_bulk
+from llm_metrics import DEFAULT_PRICES, CallMetrics, usage_cost
+from local_stand_in import LatencyProfile, StandInServer
+
+# Set up logging configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+REQUESTS = 2000
+CONCURRENCY = 16  # requests in flight, online and in the stand-in's batch worker
+API_VERSION = "2024-08-01-preview"
+DEPLOYMENT = "gpt-4o-mini"
+
+input_cost_per_1k, output_cost_per_1k = DEFAULT_PRICES[DEPLOYMENT]
+
+# data model
+
+class CalendarRequestType(BaseModel):
+    """Router LLM call: Determine the type of calendar request"""
+
+    request_type: Literal["new_event", "modify_event", "other"] = Field(
+        description="Type of calendar request being made"
+    )
+    confidence_score: float = Field(description="Confidence score between 0 and 1")
+    description: str = Field(description="Cleaned description of the request")
+
+# workload
+
+rng = random.Random(11)
+templates = [
+    "Schedule a team meeting {day} at {time} with {person}",
+    "Book a {topic} review {day} at {time}",
+    "Move the {topic} sync with {person} to {day} at {time}",
+    "Can you reschedule the {topic} standup to {time}?",
+    "What's the weather like {day}?",
+]
+topics = ["project", "budget", "hiring", "design", "launch"]
+people = ["Alice", "Bob", "Carol", "Dan"]
+days = ["tomorrow", "next Tuesday", "on Friday"]
+times = ["2pm", "10am", "noon"]
+
+def make_messages(user_input: str) -> list:
+    return [
+        {
+            "role": "system",
+            "content": "Determine if this is a request to create a new calendar event or modify an existing one.",
+        },
+        {"role": "user", "content": user_input},
+    ]
+
+workload = {
+    f"request-{i}": make_messages(
+        rng.choice(templates).format(
+            day=rng.choice(days), time=rng.choice(times), topic=rng.choice(topics), person=rng.choice(people)
+        )
+    )
+    for i in range(REQUESTS)
+}
+
+def router_responder(deployment: str, body: dict) -> str:
+    """Keyword rules standing in for the router model"""
+    text = body["messages"][-1]["content"]
+    lowered = text.lower()
+    if "move" in lowered or "reschedule" in lowered:
+        request_type = "modify_event"
+    elif "schedule" in lowered or "book" in lowered or "meeting" in lowered:
+        request_type = "new_event"
+    else:
+        request_type = "other"
+    return json.dumps({"request_type": request_type, "confidence_score": 0.9, "description": text})
+
+# functions
+
+async def run_online(server: StandInServer) -> tuple[dict, CallMetrics, float]:
+    """One parse call per request, CONCURRENCY in flight"""
+    client = AsyncAzureOpenAI(api_key="local", api_version=API_VERSION, azure_endpoint=server.endpoint)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    metrics = CallMetrics()
+    parsed = {}
+
+    async def one(custom_id: str, messages: list):
+        async with semaphore:
+            start = time.perf_counter()
+            completion = await client.beta.chat.completions.parse(
+                model=DEPLOYMENT, messages=messages, response_format=CalendarRequestType
+            )
+            metrics.record(
+                "online",
+                time.perf_counter() - start,
+                completion.usage,
+                usage_cost(completion.usage, input_cost_per_1k, output_cost_per_1k),
+            )
+            parsed[custom_id] = completion.choices[0].message.parsed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(custom_id, messages) for custom_id, messages in workload.items()))
+    return parsed, metrics, time.perf_counter() - start
+
+def report(label: str, parsed: int, seconds: float, cost: float):
+    print(f"{label:<8} {parsed:>5}/{REQUESTS} parsed  {seconds:7.1f}s  {REQUESTS / seconds:8.1f} req/s  ${cost:.4f}")
+
+def main():
+    profile = LatencyProfile(median_ms=40, stall_rate=0.01, stall_ms=500)
+    server = StandInServer(
+        DEPLOYMENT, profile, responder=router_responder, seed=3, batch_concurrency=CONCURRENCY
+    ).start()
+    try:
+        online, metrics, online_seconds = asyncio.run(run_online(server))
+        report("online", len(online), online_seconds, metrics.total_cost())
+
+        client = AzureOpenAI(api_key="local", api_version=API_VERSION, azure_endpoint=server.endpoint)
+        outcome = run_bulk(client, workload, CalendarRequestType, model=DEPLOYMENT, poll_seconds=0.2)
+        bulk_cost = outcome.cost(input_cost_per_1k, output_cost_per_1k)
+        report("bulk", len(outcome.parsed), outcome.seconds, bulk_cost)
+
+        agree = sum(
+            online[custom_id].request_type == result.request_type
+            for custom_id, result in outcome.parsed.items()
+            if custom_id in online
+        )
+        print(f"results matching the online run: {agree}/{len(outcome.parsed)}")
+        print(f"cost saved by bulk mode: {(1 - bulk_cost / metrics.total_cost()) * 100:.1f}%")
+        if outcome.errors:
+            logger.warning(f"Bulk errors: {list(outcome.errors.items())[:5]}")
+    finally:
+        server.stop()
+
+# Test out
+
+main()
@@ -0,0 +1,190 @@
+# ------------------------------------------------------------------------------
+# Offline Bulk Mode using the Batch API File Workflow
+# ------------------------------------------------------------------------------
+
+# Workload (custom_id → messages) ────────────────┐
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 1: Compile                              │
+# │  - One /chat/completions request per line,    │
+# │    response_format as a strict json_schema    │
+# │  - Split into files under the per-file limit  │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 2: Submit                               │
+# │  - files.create(purpose="batch")              │
+# │  - batches.create(completion_window="24h")    │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 3: Poll                                 │
+# │  - batches.retrieve until a terminal status   │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 4: Join                                 │
+# │  - Download output / error files              │
+# │  - Match lines back to inputs by custom_id    │
+# │  - Parse each body with the pydantic model    │
+# └───────────────────────────────────────────────┘
+#
+# For nightly jobs that don't need interactive latency: batch requests are
+# billed at a discount and don't compete with the online workflows for quota.
+
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+import io
+import json
+import logging
+import os
+import time
+
+from llm_metrics import usage_cost
+from structured_repair import repair, response_format_for
+
+logger = logging.getLogger(__name__)
+
+BATCH_DISCOUNT = 0.5  # batch requests cost half of the online price
+MAX_REQUESTS_PER_FILE = 100_000
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# data model
+
+@dataclass
+class BatchOutcome:
+    """Joined results of a bulk run"""
+
+    parsed: dict[str, Any] = field(default_factory=dict)  # custom_id → model instance
+    errors: dict[str, str] = field(default_factory=dict)  # custom_id → reason
+    batch_ids: list[str] = field(default_factory=list)
+    statuses: dict[str, str] = field(default_factory=dict)  # batch_id → terminal status
+    repaired: int = 0  # malformed outputs fixed locally
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    seconds: float = 0.0
+
+    def cost(self, input_cost_per_1k: float, output_cost_per_1k: float) -> float:
+        usage = {"prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+        return usage_cost(usage, input_cost_per_1k, output_cost_per_1k) * BATCH_DISCOUNT
+
+# workflow
+
+def compile_requests(workload: dict[str, list], model: str, response_format) -> list[str]:
+    """One Batch API request line per workload item"""
+    format_param = response_format_for(response_format)
+    return [
+        json.dumps(
+            {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/chat/completions",
+                "body": {"model": model, "messages": messages, "response_format": format_param},
+            }
+        )
+        for custom_id, messages in workload.items()
+    ]
+
+def submit(client, lines: list[str], max_requests_per_file: int = MAX_REQUESTS_PER_FILE) -> list[str]:
+    """Upload the request files and start one batch per file"""
+    batch_ids = []
+    for start in range(0, len(lines), max_requests_per_file):
+        chunk = "\n".join(lines[start:start + max_requests_per_file]).encode()
+        upload = client.files.create(file=(f"bulk-{start}.jsonl", io.BytesIO(chunk)), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=upload.id, endpoint="/chat/completions", completion_window="24h"
+        )
+        logger.info(f"Submitted batch {batch.id} with {len(lines[start:start + max_requests_per_file])} requests")
+        batch_ids.append(batch.id)
+    return batch_ids
+
+def wait(client, batch_ids: list[str], poll_seconds: float = 30.0, timeout_seconds: float = 24 * 3600) -> list:
+    """Poll until every batch reaches a terminal status"""
+    deadline = time.monotonic() + timeout_seconds
+    pending = list(batch_ids)
+    finished = {}
+    while pending:
+        for batch_id in list(pending):
+            batch = client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                logger.info(f"Batch {batch_id} {batch.status}: {batch.request_counts}")
+                finished[batch_id] = batch
+                pending.remove(batch_id)
+        if pending:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Batches still running: {pending}")
+            time.sleep(poll_seconds)
+    return [finished[batch_id] for batch_id in batch_ids]
+
+def collect(client, batches: list, response_format, outcome: BatchOutcome):
+    """Download results and join them back to the inputs by custom_id"""
+    for batch in batches:
+        outcome.statuses[batch.id] = batch.status
+        if batch.status != "completed":
+            logger.warning(f"Batch {batch.id} ended {batch.status}: {batch.request_counts}")
+        if batch.output_file_id:
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                _join_line(json.loads(line), response_format, outcome)
+        if batch.error_file_id:
+            for line in client.files.content(batch.error_file_id).text.splitlines():
+                _join_line(json.loads(line), response_format, outcome)
+
+def batch_reason(batch) -> str:
+    """Batch status plus its first error, for items the batch returned nothing for"""
+    reason = f"no result returned, batch {batch.id} {batch.status}"
+    errors = getattr(batch.errors, "data", None) if getattr(batch, "errors", None) else None
+    if errors:
+        reason += f": {errors[0].code}: {errors[0].message}"
+    return reason
+
+def _join_line(record: dict, response_format, outcome: BatchOutcome):
+    custom_id = record["custom_id"]
+    response = record.get("response")
+    if record.get("error") or not response or response.get("status_code") != 200:
+        outcome.errors[custom_id] = json.dumps(record.get("error") or response)
+        return
+
+    body = response["body"]
+    usage = body.get("usage") or {}
+    outcome.prompt_tokens += usage.get("prompt_tokens", 0)
+    outcome.completion_tokens += usage.get("completion_tokens", 0)
+    content = body["choices"][0]["message"].get("content")
+    result = repair(content, response_format)  # no re-ask offline, missing fields are reported
+    if result.parsed is None:
+        outcome.errors[custom_id] = f"unparseable output, missing fields: {result.missing}"
+        return
+    outcome.repaired += result.repaired
+    outcome.parsed[custom_id] = result.parsed
+
+def run_bulk(
+    client,
+    workload: dict[str, list],
+    response_format,
+    model: Optional[str] = None,
+    poll_seconds: float = 30.0,
+    max_requests_per_file: int = MAX_REQUESTS_PER_FILE,
+) -> BatchOutcome:
+    """Compile, submit, poll and join a whole workload"""
+    model = model or os.getenv("AZURE_BATCH_DEPLOYMENT_NAME") or os.getenv("AZURE_DEPLOYMENT_NAME")
+    start = time.perf_counter()
+    outcome = BatchOutcome()
+
+    lines = compile_requests(workload, model, response_format)
+    outcome.batch_ids = submit(client, lines, max_requests_per_file)
+    batches = wait(client, outcome.batch_ids, poll_seconds=poll_seconds)
+    collect(client, batches, response_format, outcome)
+
+    # items a batch returned nothing for get that batch's status and error
+    custom_ids = list(workload)
+    for index, batch in enumerate(batches):
+        chunk = custom_ids[index * max_requests_per_file:(index + 1) * max_requests_per_file]
+        for custom_id in chunk:
+            if custom_id not in outcome.parsed and custom_id not in outcome.errors:
+                outcome.errors[custom_id] = batch_reason(batch)
+    outcome.seconds = time.perf_counter() - start
+    logger.info(
+        f"Bulk run done: {len(outcome.parsed)} parsed ({outcome.repaired} repaired), "
+        f"{len(outcome.errors)} errors in {outcome.seconds:.1f}s"
+    )
+    return outcome
@@ -0,0 +1,99 @@
+# ------------------------------------------------------------------------------
+# Benchmark: Calendar Store at 10^6 Events
+# ------------------------------------------------------------------------------
+
+# Loads a million synthetic events spread over a year into CalendarStore
+# (see calendar_store.py) and times:
+#
+#   - bulk insert (buffered adds + flush)
+#   - incremental insert into the loaded store
+#   - conflict checks, with and without participants
+#   - event_identifier lookups through the name index
+#   - snapshot save / load
+
+
+from datetime import datetime, timedelta
+import logging
+import os
+import random
+import tempfile
+import time
+
+from calendar_store import CalendarStore
+
+# Set up logging configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+EVENTS = 1_000_000
+QUERIES = 10_000
+LOOKUPS = 1_000
+
+rng = random.Random(42)
+year_start = datetime(2025, 1, 1)
+people = [f"person{i}" for i in range(20_000)]
+topics = ["team", "project", "roadmap", "design", "budget", "hiring", "customer", "launch", "security", "sprint"]
+kinds = ["meeting", "sync", "review", "planning", "standup", "retro", "workshop", "call"]
+
+def random_event() -> tuple[str, datetime, int, list[str]]:
+    name = f"{rng.choice(topics).title()} {rng.choice(kinds)} {rng.randrange(5000)}"
+    start = year_start + timedelta(minutes=15 * rng.randrange(365 * 24 * 4))
+    return name, start, rng.choice([15, 30, 45, 60, 90, 120]), rng.sample(people, rng.randint(1, 4))
+
+def report(label: str, count: int, seconds: float):
+    print(f"{label:<36} {count:>9,} ops  {seconds:7.2f}s  {count / seconds:>11,.0f} ops/s  {seconds / count * 1e6:8.1f} µs/op")
+
+# Test out
+
+events = [random_event() for _ in range(EVENTS)]
+store = CalendarStore()
+
+start = time.perf_counter()
+for name, begin, duration, participants in events:
+    store.add(name, begin, duration, participants)
+store.flush()
+report("bulk insert", EVENTS, time.perf_counter() - start)
+
+extra = [random_event() for _ in range(QUERIES)]
+start = time.perf_counter()
+for name, begin, duration, participants in extra:
+    store.add(name, begin, duration, participants)
+    store.flush()  # worst case: every write applied immediately
+report("incremental insert (unbatched)", QUERIES, time.perf_counter() - start)
+
+slots = [random_event() for _ in range(QUERIES)]
+start = time.perf_counter()
+clashes = sum(len(store.conflicts(begin, duration)) for _, begin, duration, _ in slots)
+report("conflict check (any event)", QUERIES, time.perf_counter() - start)
+logger.info(f"Average {clashes / QUERIES:.1f} overlapping events per slot")
+
+start = time.perf_counter()
+for _, begin, duration, participants in slots:
+    store.conflicts(begin, duration, participants)
+report("conflict check (participants)", QUERIES, time.perf_counter() - start)
+
+targets = rng.sample(events, LOOKUPS)
+start = time.perf_counter()
+found = 0
+for name, _, _, participants in targets:
+    event = store.find(f"the {name.lower()} with {participants[0]}")
+    found += event is not None and event.name == name
+report("find event_identifier", LOOKUPS, time.perf_counter() - start)
+logger.info(f"Resolved {found}/{LOOKUPS} identifiers to the intended event")
+
+unknown = ["my dentist appointment", "the plumber visit", "zorblax quarterly meeting"]
+wrong = [identifier for identifier in unknown if store.find(identifier) is not None]
+logger.info(f"Unknown identifiers left unresolved: {len(unknown) - len(wrong)}/{len(unknown)} {wrong or ''}")
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "calendar.pkl")
+    start = time.perf_counter()
+    store.save(path)
+    report("snapshot save", len(store), time.perf_counter() - start)
+    start = time.perf_counter()
+    CalendarStore.load(path)
+    report("snapshot load", len(store), time.perf_counter() - start)
@@ -0,0 +1,418 @@
+# ------------------------------------------------------------------------------
+# Indexed In-Memory Calendar Store
+# ------------------------------------------------------------------------------
+
+# Backs handle_new_event / handle_modify_event in routing-pattern.py.
+#
+# ┌───────────────────────────────────────────────┐
+# │  Time Index (sorted, bucketed)                │
+# │  - Events sorted by start time in buckets of  │
+# │    ~1000, so an insert is a bisect plus a     │
+# │    small list insert                          │
+# │  - Range / conflict query: scan starts in     │
+# │    [start - longest duration, end)            │
+# │  - Events longer than a day live in a short   │
+# │    side list so they don't widen every scan   │
+# └───────────────────────────────────────────────┘
+# ┌───────────────────────────────────────────────┐
+# │  Participant Index                            │
+# │  - participant → event ids                    │
+# └───────────────────────────────────────────────┘
+# ┌───────────────────────────────────────────────┐
+# │  Name Index                                   │
+# │  - name token → event ids, scored by IDF      │
+# │  - Unknown tokens matched to close spellings  │
+# │  - Resolves event_identifier without an LLM   │
+# └───────────────────────────────────────────────┘
+#
+# Writes are buffered and applied in sorted batches on flush (or on the next
+# read), and the whole store can be snapshotted to local disk.
+
+
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, time as time_of_day
+from difflib import SequenceMatcher, get_close_matches
+from typing import Iterable, Iterator, Optional
+import logging
+import math
+import os
+import pickle
+import re
+
+logger = logging.getLogger(__name__)
+
+LONG_EVENT_SECONDS = 24 * 3600
+_TOKEN = re.compile(r"[a-z0-9]+")
+_CLOCK = re.compile(r"^(\d{1,2})(?::(\d{2}))?(?::\d{2})?\s*(am|pm)?$")
+_DATE_ONLY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_STOPWORDS = {"the", "a", "an", "with", "and", "for", "to", "of", "on", "at", "in", "my", "our", "event"}
+# time words say when, not which event; they don't count against a match
+_GENERIC = {
+    "today", "tomorrow", "yesterday", "next", "this", "last", "week", "morning", "afternoon", "evening", "am", "pm",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+}
+
+# helpers
+
+def parse_datetime(value: str) -> datetime:
+    """ISO 8601 date or date-time, as produced by the extraction prompts"""
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+
+def parse_time(value: str) -> time_of_day:
+    """Time of day such as 15:00 or 3:30pm"""
+    match = _CLOCK.match(value.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid time of day: {value!r}")
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    return time_of_day(hour, minute)
+
+def is_time_only(value: str) -> bool:
+    return _CLOCK.match(value.strip().lower()) is not None
+
+def is_date_only(value: str) -> bool:
+    return _DATE_ONLY.match(value.strip()) is not None
+
+def normalize_participant(name: str) -> str:
+    return " ".join(name.lower().split())
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+def is_generic(token: str) -> bool:
+    return token in _GENERIC or any(ch.isdigit() for ch in token)
+
+# data model
+
+@dataclass(slots=True)
+class Event:
+    """One calendar event, times as POSIX timestamps"""
+
+    id: int
+    name: str
+    start: float
+    end: float
+    participants: tuple[str, ...]
+
+    @property
+    def duration_minutes(self) -> int:
+        return round((self.end - self.start) / 60)
+
+    def overlaps(self, start: float, end: float) -> bool:
+        return self.start < end and self.end > start
+
+# time index
+
+class _StartIndex:
+    """Event ids sorted by start time, split into small buckets"""
+
+    def __init__(self, load: int = 1000):
+        self.load = load
+        self._starts: list[list[float]] = []
+        self._ids: list[list[int]] = []
+        self._maxes: list[float] = []
+        self.size = 0
+
+    def bulk_load(self, pairs: list[tuple[float, int]]):
+        """Replace the contents with already sorted (start, id) pairs"""
+        self._starts = [[s for s, _ in pairs[i:i + self.load]] for i in range(0, len(pairs), self.load)]
+        self._ids = [[e for _, e in pairs[i:i + self.load]] for i in range(0, len(pairs), self.load)]
+        self._maxes = [bucket[-1] for bucket in self._starts]
+        self.size = len(pairs)
+
+    def insert(self, start: float, event_id: int):
+        if not self._maxes:
+            self._starts, self._ids, self._maxes = [[start]], [[event_id]], [start]
+            self.size = 1
+            return
+        i = min(bisect_right(self._maxes, start), len(self._maxes) - 1)
+        starts, ids = self._starts[i], self._ids[i]
+        j = bisect_right(starts, start)
+        starts.insert(j, start)
+        ids.insert(j, event_id)
+        self._maxes[i] = starts[-1]
+        self.size += 1
+        if len(starts) > 2 * self.load:
+            half = len(starts) // 2
+            self._starts[i:i + 1] = [starts[:half], starts[half:]]
+            self._ids[i:i + 1] = [ids[:half], ids[half:]]
+            self._maxes[i:i + 1] = [starts[half - 1], starts[-1]]
+
+    def remove(self, start: float, event_id: int):
+        i = bisect_left(self._maxes, start)
+        while i < len(self._maxes):
+            starts, ids = self._starts[i], self._ids[i]
+            j = bisect_left(starts, start)
+            while j < len(starts) and starts[j] == start:
+                if ids[j] == event_id:
+                    del starts[j], ids[j]
+                    self.size -= 1
+                    if starts:
+                        self._maxes[i] = starts[-1]
+                    else:
+                        del self._starts[i], self._ids[i], self._maxes[i]
+                    return
+                j += 1
+            if j < len(starts):
+                break
+            i += 1
+        raise KeyError(event_id)
+
+    def between(self, low: float, high: float) -> Iterator[int]:
+        """Ids with low <= start < high, in start order"""
+        i = bisect_left(self._maxes, low)
+        first = True
+        while i < len(self._maxes):
+            starts, ids = self._starts[i], self._ids[i]
+            j = bisect_left(starts, low) if first else 0
+            first = False
+            while j < len(starts):
+                if starts[j] >= high:
+                    return
+                yield ids[j]
+                j += 1
+            i += 1
+
+# store
+
+class CalendarStore:
+    """Calendar events with time, participant and name indexes"""
+
+    def __init__(self, batch_size: int = 10_000):
+        self.batch_size = batch_size
+        self._events: dict[int, Event] = {}
+        self._pending: list[Event] = []
+        self._index = _StartIndex()
+        self._long_events: set[int] = set()
+        self._max_duration = 0.0
+        self._by_participant: dict[str, set[int]] = {}
+        self._by_token: dict[str, set[int]] = {}
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._events) + len(self._pending)
+
+    # writes
+
+    def add(self, name: str, start: datetime, duration_minutes: int, participants: Iterable[str] = ()) -> Event:
+        """Buffer a new event; it is indexed on the next flush or read"""
+        begin = start.timestamp()
+        event = Event(
+            id=self._next_id,
+            name=name,
+            start=begin,
+            end=begin + duration_minutes * 60,
+            participants=tuple(dict.fromkeys(normalize_participant(p) for p in participants)),
+        )
+        self._next_id += 1
+        self._pending.append(event)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return event
+
+    def flush(self):
+        """Apply buffered writes in start order"""
+        if not self._pending:
+            return
+        pending = sorted(self._pending, key=lambda e: (e.start, e.id))
+        self._pending = []
+        if self._index.size == 0 and not self._long_events:
+            short = [e for e in pending if e.end - e.start <= LONG_EVENT_SECONDS]
+            self._index.bulk_load([(e.start, e.id) for e in short])
+            for event in pending:
+                self._index_event(event, time_index=False)
+                if event.end - event.start > LONG_EVENT_SECONDS:
+                    self._long_events.add(event.id)
+                else:
+                    self._max_duration = max(self._max_duration, event.end - event.start)
+        else:
+            for event in pending:
+                self._index_event(event)
+        logger.debug(f"Flushed {len(pending)} events, store now holds {len(self._events)}")
+
+    def update(
+        self,
+        event_id: int,
+        name: Optional[str] = None,
+        start: Optional[datetime] = None,
+        duration_minutes: Optional[int] = None,
+        participants: Optional[Iterable[str]] = None,
+    ) -> Event:
+        """Change an existing event and re-index it"""
+        self.flush()
+        event = self._events[event_id]
+        self._unindex_event(event)
+        if duration_minutes is None:
+            duration_minutes = event.duration_minutes
+        if start is not None:
+            event.start = start.timestamp()
+        event.end = event.start + duration_minutes * 60
+        if name is not None:
+            event.name = name
+        if participants is not None:
+            event.participants = tuple(dict.fromkeys(normalize_participant(p) for p in participants))
+        self._index_event(event)
+        return event
+
+    def remove(self, event_id: int) -> Event:
+        self.flush()
+        event = self._events[event_id]
+        self._unindex_event(event)
+        return event
+
+    # reads
+
+    def get(self, event_id: int) -> Optional[Event]:
+        self.flush()
+        return self._events.get(event_id)
+
+    def between(self, start: datetime, end: datetime) -> list[Event]:
+        """Events overlapping [start, end), in start order"""
+        return self._overlapping(start.timestamp(), end.timestamp())
+
+    def conflicts(self, start: datetime, duration_minutes: int, participants: Optional[Iterable[str]] = None) -> list[Event]:
+        """
+        Events overlapping the slot. With participants, only events sharing one
+        of them, looked up through the participant index.
+        """
+        self.flush()
+        begin = start.timestamp()
+        end = begin + duration_minutes * 60
+        if participants is None:
+            return self._overlapping(begin, end)
+
+        seen = set()
+        clashes = []
+        for participant in participants:
+            for event_id in self._by_participant.get(normalize_participant(participant), ()):
+                event = self._events[event_id]
+                if event_id not in seen and event.overlaps(begin, end):
+                    seen.add(event_id)
+                    clashes.append(event)
+        return sorted(clashes, key=lambda e: e.start)
+
+    def events_for(self, participant: str) -> list[Event]:
+        self.flush()
+        ids = self._by_participant.get(normalize_participant(participant), ())
+        return sorted((self._events[i] for i in ids), key=lambda e: e.start)
+
+    def find(self, identifier: str, candidate_cap: int = 5_000, min_coverage: float = 0.6) -> Optional[Event]:
+        """
+        Resolve a free text description ("the team meeting with Alice and Bob")
+        to the best matching event, without an LLM call. None unless the event
+        covers at least min_coverage of the (IDF weighted) non-generic query
+        tokens, so "my dentist meeting" doesn't resolve to "Team Meeting".
+        """
+        self.flush()
+        tokens = tokenize(identifier)
+        if not tokens or not self._events:
+            return None
+
+        total = len(self._events)
+        postings = []
+        content = []  # (posting sets, weight) per non-generic query token
+        for token in tokens:
+            ids = self._by_token.get(token)
+            participant_ids = self._by_participant.get(token)
+            if not ids and not participant_ids:
+                close = get_close_matches(token, self._by_token.keys(), n=1, cutoff=0.8)
+                ids = self._by_token[close[0]] if close else None
+            if ids:
+                postings.append(ids)
+            if participant_ids:
+                postings.append(participant_ids)
+            if not is_generic(token):
+                token_sets = [found for found in (ids, participant_ids) if found]
+                rarest = min((len(found) for found in token_sets), default=1)  # unknown tokens count as rare
+                content.append((token_sets, math.log(1 + total / rarest)))
+
+        if not postings:
+            return None
+
+        # candidates come from the rare tokens; common ones ("meeting") only add score
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            if len(ids) > candidate_cap:
+                break
+            candidates.update(ids)
+
+        weights = [(ids, math.log(1 + total / len(ids))) for ids in postings]
+        scores = Counter({event_id: sum(w for ids, w in weights if event_id in ids) for event_id in candidates})
+
+        query = " ".join(tokens)
+        best_id, _ = max(
+            scores.most_common(20),
+            key=lambda item: (item[1], SequenceMatcher(None, query, self._events[item[0]].name.lower()).ratio()),
+        )
+        needed = sum(weight for _, weight in content)
+        covered = sum(weight for token_sets, weight in content if any(best_id in found for found in token_sets))
+        if not needed or covered / needed < min_coverage:
+            logger.info(f"No confident match for '{identifier}' (coverage {covered / needed if needed else 0:.2f})")
+            return None
+        return self._events[best_id]
+
+    # persistence
+
+    def save(self, path: str):
+        """Snapshot all events to disk (atomic replace)"""
+        self.flush()
+        rows = [(e.id, e.name, e.start, e.end, e.participants) for e in self._events.values()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"next_id": self._next_id, "events": rows}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved {len(rows)} events to {path}")
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "CalendarStore":
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+        store = cls(**kwargs)
+        store._pending = [Event(*row) for row in snapshot["events"]]
+        store._next_id = snapshot["next_id"]
+        store.flush()
+        logger.info(f"Loaded {len(store)} events from {path}")
+        return store
+
+    # internals
+
+    def _overlapping(self, begin: float, end: float) -> list[Event]:
+        self.flush()
+        hits = [
+            self._events[i]
+            for i in self._index.between(begin - self._max_duration, end)
+            if self._events[i].end > begin
+        ]
+        hits.extend(self._events[i] for i in self._long_events if self._events[i].overlaps(begin, end))
+        return sorted(hits, key=lambda e: e.start)
+
+    def _index_event(self, event: Event, time_index: bool = True):
+        self._events[event.id] = event
+        if time_index:
+            duration = event.end - event.start
+            if duration > LONG_EVENT_SECONDS:
+                self._long_events.add(event.id)
+            else:
+                self._max_duration = max(self._max_duration, duration)
+                self._index.insert(event.start, event.id)
+        for participant in event.participants:
+            self._by_participant.setdefault(participant, set()).add(event.id)
+        for token in set(tokenize(event.name)):
+            self._by_token.setdefault(token, set()).add(event.id)
+
+    def _unindex_event(self, event: Event):
+        del self._events[event.id]
+        if event.id in self._long_events:
+            self._long_events.discard(event.id)
+        else:
+            self._index.remove(event.start, event.id)
+        for participant in event.participants:
+            self._by_participant[participant].discard(event.id)
+        for token in set(tokenize(event.name)):
+            self._by_token[token].discard(event.id)
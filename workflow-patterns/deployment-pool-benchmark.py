@@ -0,0 +1,121 @@
+# ------------------------------------------------------------------------------
+# Benchmark: Single Deployment vs Deployment Pool vs Pool + Hedging
+# ------------------------------------------------------------------------------
+
+# Starts three local stand-in deployments with different latency profiles
+# (see local_stand_in.py), one of them stalling and throttling with 429s, and
+# replays the same request stream, at a fixed concurrency, against:
+#
+#   1. a single deployment (what the other scripts do today)
+#   2. the pool, least-outstanding-requests only
+#   3. the pool with hedged requests after the learned p95
+#
+# and reports p50 / p95 / p99 latency, failed requests, how many calls were
+# hedged or failed over, and the p99 improvement. Clients don't retry on
+# their own (max_retries=0), so every 429 reaches the pool's health tracking.
+
+
+from openai import AsyncAzureOpenAI
+import asyncio
+import logging
+import time
+
+from deployment_pool import Deployment, DeploymentPool, percentile
+from local_stand_in import LatencyProfile, StandInServer
+
+# Set up logging configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+REQUESTS = 400
+CONCURRENCY = 8
+API_VERSION = "2024-08-01-preview"
+
+profiles = {
+    "eastus": LatencyProfile(median_ms=60, stall_rate=0.05, stall_ms=900),
+    "westus": LatencyProfile(median_ms=80, stall_rate=0.02, stall_ms=900),
+    "swedencentral": LatencyProfile(median_ms=120, stall_rate=0.10, stall_ms=1500, error_rate=0.3),  # throttled
+}
+
+# functions
+
+def make_pool(servers: list[StandInServer], **kwargs) -> DeploymentPool:
+    deployments = [
+        Deployment(
+            name=server.name,
+            client=AsyncAzureOpenAI(
+                api_key="local", api_version=API_VERSION, azure_endpoint=server.endpoint, max_retries=0
+            ),
+            model=server.name,
+        )
+        for server in servers
+    ]
+    return DeploymentPool(deployments, **kwargs)
+
+async def run_workload(pool: DeploymentPool) -> tuple[list[float], int]:
+    """Replay REQUESTS calls through the pool with a fixed concurrency"""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+    failed = 0
+
+    async def one(i: int):
+        nonlocal failed
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await pool.call(
+                    lambda client, model: client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": "Determine if this is a calendar event request."},
+                            {"role": "user", "content": f"Schedule a team meeting #{i} tomorrow at 2pm"},
+                        ],
+                    )
+                )
+            except Exception:
+                failed += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    return latencies, failed
+
+def summarize(label: str, pool: DeploymentPool, run: tuple[list[float], int]) -> dict:
+    latencies, failed = run
+    summary = {pct: percentile(latencies, pct) * 1000 for pct in (50, 95, 99)}
+    print(
+        f"{label:<24} p50={summary[50]:7.1f}ms  p95={summary[95]:7.1f}ms  p99={summary[99]:7.1f}ms  "
+        f"failed={failed}  hedged={pool.hedged}  failed_over={pool.failed_over}"
+    )
+    return summary
+
+async def main():
+    servers = [StandInServer(name, profile, seed=i).start() for i, (name, profile) in enumerate(profiles.items())]
+    try:
+        results = {}
+
+        single = make_pool(servers[:1])
+        results["single deployment"] = summarize("single deployment", single, await run_workload(single))
+
+        balanced = make_pool(servers)
+        results["pool"] = summarize("pool", balanced, await run_workload(balanced))
+        logger.info(f"Pool stats: {balanced.stats()}")
+
+        hedged = make_pool(servers, hedge=True)
+        results["pool + hedging"] = summarize("pool + hedging", hedged, await run_workload(hedged))
+        logger.info(f"Hedged pool stats: {hedged.stats()}")
+
+        baseline = results["single deployment"][99]
+        for label in ("pool", "pool + hedging"):
+            improvement = (1 - results[label][99] / baseline) * 100
+            print(f"p99 improvement ({label} vs single deployment): {improvement:.1f}%")
+    finally:
+        for server in servers:
+            server.stop()
+
+# Test out
+
+asyncio.run(main())
@@ -0,0 +1,323 @@
+# ------------------------------------------------------------------------------
+# Deployment Pool: Least-Outstanding Load Balancing with Hedged Requests
+# ------------------------------------------------------------------------------
+
+# LLM Call ───────────────────────────────────────┐
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 1: Pick a Deployment                    │
+# │  - Skip deployments cooling down (ejected):   │
+# │    repeated failures, a high recent error     │
+# │    rate, or latency far above the fastest     │
+# │  - Choose the fewest outstanding requests,    │
+# │    ties broken by recent latency              │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 2: Hedge (optional)                     │
+# │  - If the call is still running after the     │
+# │    learned p95 end-to-end latency, fire a     │
+# │    duplicate at a second deployment, for at   │
+# │    most max_hedge_rate of the calls           │
+# │  - Take whichever returns first, cancel the   │
+# │    other                                      │
+# │  - A failed call is retried once on another   │
+# │    deployment                                 │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Final Output:                                │
+# │  - Result of the winning call                 │
+# │  - Per-deployment latency / health stats      │
+# └───────────────────────────────────────────────┘
+
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# helpers
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a sequence of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def counts_as_failure(error: BaseException) -> bool:
+    """Client errors (bad request, content policy) say nothing about deployment health, throttling does"""
+    status = getattr(error, "status_code", None)
+    if status is not None and 400 <= status < 500 and status != 429:
+        return False
+    return True
+
+# data model
+
+@dataclass
+class Deployment:
+    """One model deployment behind the pool"""
+
+    name: str
+    client: Any
+    model: str
+    outstanding: int = 0
+    requests: int = 0
+    failures: int = 0
+    hedges_won: int = 0
+    ejections: int = 0
+    consecutive_failures: int = 0
+    unhealthy_until: float = 0.0
+    ewma_latency: float = 0.0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=200))
+    outcomes: deque = field(default_factory=lambda: deque(maxlen=50))  # 1 = failed, since the last ejection
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def record_latency(self, latency: float):
+        """Also called for cancelled calls: the time they ran is a lower bound on their latency"""
+        self.latencies.append(latency)
+        self.ewma_latency = latency if not self.ewma_latency else 0.8 * self.ewma_latency + 0.2 * latency
+
+    def record_success(self, latency: float):
+        self.consecutive_failures = 0
+        self.outcomes.append(0)
+        self.record_latency(latency)
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.outcomes.append(1)
+
+    def eject(self, cooldown_seconds: float, reason: str):
+        """Take the deployment out of rotation and start its samples over"""
+        self.unhealthy_until = time.monotonic() + cooldown_seconds
+        self.ejections += 1
+        self.consecutive_failures = 0
+        self.outcomes.clear()
+        self.latencies.clear()
+        self.ewma_latency = 0.0
+        logger.warning(f"Deployment {self.name} ejected for {cooldown_seconds:.0f}s: {reason}")
+
+# pool
+
+class DeploymentPool:
+    """Spread calls across deployments and optionally hedge slow ones"""
+
+    def __init__(
+        self,
+        deployments: list[Deployment],
+        hedge: bool = False,
+        hedge_percentile: float = 95,
+        max_hedge_rate: float = 0.05,
+        min_samples: int = 20,
+        failure_threshold: int = 3,
+        max_error_rate: float = 0.25,
+        slow_factor: float = 2.0,
+        ejection_samples: int = 10,
+        cooldown_seconds: float = 30.0,
+        window: int = 500,
+    ):
+        if not deployments:
+            raise ValueError("DeploymentPool needs at least one deployment")
+        self.deployments = deployments
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.max_error_rate = max_error_rate
+        self.slow_factor = slow_factor  # eject at slow_factor x the fastest deployment's median latency
+        self.ejection_samples = ejection_samples
+        self.cooldown_seconds = cooldown_seconds
+        self.calls = 0
+        self.hedged = 0
+        self.failed_over = 0
+        self._latencies = deque(maxlen=window)  # end-to-end, per call()
+
+    @classmethod
+    def from_env(cls, client_cls, **kwargs) -> "DeploymentPool":
+        """
+        Build a pool from AZURE_OPENAI_DEPLOYMENTS, a comma separated list of
+        deployment@endpoint pairs; an entry without @endpoint uses
+        AZURE_OPENAI_ENDPOINT. Falls back to the single
+        AZURE_DEPLOYMENT_NAME / AZURE_OPENAI_ENDPOINT used by the other scripts.
+        """
+        spec = os.getenv("AZURE_OPENAI_DEPLOYMENTS")
+        if spec:
+            default_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+            pairs = []
+            for item in (item.strip() for item in spec.split(",")):
+                if not item:
+                    continue
+                model, _, endpoint = item.partition("@")
+                endpoint = endpoint or default_endpoint
+                if not model or not endpoint:
+                    raise ValueError(
+                        f"Invalid AZURE_OPENAI_DEPLOYMENTS entry {item!r}: expected deployment@endpoint "
+                        "(or set AZURE_OPENAI_ENDPOINT for entries without @endpoint)"
+                    )
+                pairs.append((model, endpoint))
+        else:
+            pairs = [(os.getenv("AZURE_DEPLOYMENT_NAME"), os.getenv("AZURE_OPENAI_ENDPOINT"))]
+
+        clients = {}  # one client (and connection pool) per endpoint
+        deployments = []
+        for model, endpoint in pairs:
+            if endpoint not in clients:
+                clients[endpoint] = client_cls(
+                    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+                    azure_endpoint=endpoint,
+                )
+            deployments.append(Deployment(name=f"{model}@{endpoint}", client=clients[endpoint], model=model))
+        return cls(deployments, **kwargs)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Learned latency after which a duplicate request is fired, None while hedging is off or capped"""
+        if not self.hedge or len(self.deployments) < 2 or len(self._latencies) < self.min_samples:
+            return None
+        if self.hedged >= self.max_hedge_rate * self.calls:
+            return None
+        return percentile(self._latencies, self.hedge_percentile)
+
+    def pick(self, exclude: tuple = ()) -> Optional[Deployment]:
+        """Least outstanding requests among healthy deployments"""
+        candidates = [d for d in self.deployments if d.name not in exclude]
+        healthy = [d for d in candidates if d.healthy]
+        if healthy:
+            candidates = healthy
+        elif exclude:
+            return None  # don't hedge onto a deployment we know is sick
+        if not candidates:
+            return None
+        return min(candidates, key=lambda d: (d.outstanding, d.ewma_latency))
+
+    async def call(self, fn: Callable[[Any, str], Awaitable[Any]]) -> Any:
+        """Run fn(client, model) on the best deployment, hedging if it runs long"""
+        start = time.perf_counter()
+        self.calls += 1
+        primary = self.pick()
+        tried = [primary.name]
+        tasks = {asyncio.ensure_future(self._attempt(primary, fn))}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    backup = self.pick(exclude=tried)
+                    if backup is not None:
+                        self.hedged += 1
+                        tried.append(backup.name)
+                        logger.debug(f"Hedging {primary.name} -> {backup.name} after {delay * 1000:.0f}ms")
+                        tasks.add(asyncio.ensure_future(self._attempt(backup, fn, hedge=True)))
+
+            error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._latencies.append(time.perf_counter() - start)
+                        return task.result()
+                    error = task.exception()
+                if not pending and len(tried) == 1 and counts_as_failure(error):
+                    backup = self.pick(exclude=tried)
+                    if backup is not None:
+                        self.failed_over += 1
+                        tried.append(backup.name)
+                        logger.debug(f"Retrying on {backup.name} after {primary.name} failed: {error}")
+                        task = asyncio.ensure_future(self._attempt(backup, fn))
+                        tasks.add(task)
+                        pending = {task}
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempt(self, deployment: Deployment, fn, hedge: bool = False):
+        deployment.outstanding += 1
+        deployment.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await fn(deployment.client, deployment.model)
+        except asyncio.CancelledError:
+            deployment.record_latency(time.perf_counter() - start)  # lost a hedge race, not a failure
+            raise
+        except Exception as e:
+            if counts_as_failure(e):
+                deployment.record_failure()
+                self._check_errors(deployment)
+            raise
+        finally:
+            deployment.outstanding -= 1
+
+        deployment.record_success(time.perf_counter() - start)
+        self._check_latency(deployment)
+        if hedge:
+            deployment.hedges_won += 1
+        return result
+
+    def _others_healthy(self, deployment: Deployment) -> list[Deployment]:
+        return [d for d in self.deployments if d is not deployment and d.healthy]
+
+    def _check_errors(self, deployment: Deployment):
+        """Eject after failure_threshold failures in a row, or a recent error rate above max_error_rate"""
+        if deployment.consecutive_failures >= self.failure_threshold:
+            deployment.eject(self.cooldown_seconds, f"{deployment.consecutive_failures} failures in a row")
+        elif (
+            len(deployment.outcomes) >= self.ejection_samples
+            and deployment.error_rate > self.max_error_rate
+            and self._others_healthy(deployment)
+        ):
+            deployment.eject(self.cooldown_seconds, f"error rate {deployment.error_rate:.0%}")
+
+    def _check_latency(self, deployment: Deployment):
+        """Eject a deployment whose median latency is slow_factor times the fastest healthy one's"""
+        if len(deployment.latencies) < self.ejection_samples:
+            return
+        # medians, so a single stall doesn't eject an otherwise fast deployment
+        peers = [
+            percentile(d.latencies, 50)
+            for d in self._others_healthy(deployment)
+            if len(d.latencies) >= self.ejection_samples
+        ]
+        median = percentile(deployment.latencies, 50)
+        if peers and median > self.slow_factor * min(peers):
+            deployment.eject(
+                self.cooldown_seconds, f"median latency {median * 1000:.0f}ms vs {min(peers) * 1000:.0f}ms on the fastest"
+            )
+
+    def stats(self) -> dict:
+        """Per-deployment request, failure and latency summary"""
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "failed_over": self.failed_over,
+            "deployments": {
+                d.name: {
+                    "requests": d.requests,
+                    "failures": d.failures,
+                    "hedges_won": d.hedges_won,
+                    "ejections": d.ejections,
+                    "healthy": d.healthy,
+                    "p50_ms": round(percentile(d.latencies, 50) * 1000, 1),
+                    "p95_ms": round(percentile(d.latencies, 95) * 1000, 1),
+                }
+                for d in self.deployments
+            },
+        }
@@ -0,0 +1,274 @@
+# ------------------------------------------------------------------------------
+# Local Prompt-Injection Signature Scanner
+# ------------------------------------------------------------------------------
+
+# User Input ─────────────────────────────────────┐
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 1: Normalize                            │
+# │  - NFKC (fullwidth, ligatures), casefold      │
+# │  - Strip zero-width characters                │
+# │  - Map homoglyphs / leetspeak to ASCII        │
+# │    (Cyrillic "о" → o, "0" → o, "@" → a)       │
+# │  - Split on anything that isn't a letter or   │
+# │    digit, re-join s p a c e d letters         │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 2: Canonicalize Words                   │
+# │  - Synonyms share one symbol                  │
+# │    (disregard / forget → ignore)              │
+# │  - Filler words ("all", "the") are skipped    │
+# │  - Words outside the signatures reset         │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 3: Aho-Corasick over the Word Stream    │
+# │  - Every signature phrase matched in a        │
+# │    single pass, whatever the list size        │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Final Output:                                │
+# │  - "block" hit, or suspect hits that combine  │
+# │    (reveal / override plus an exfiltration    │
+# │    target) → risk flags, no LLM call          │
+# │  - Other suspect hits or no hit → LLM check   │
+# └───────────────────────────────────────────────┘
+
+
+from collections import deque
+from typing import NamedTuple, Optional
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# signature list
+
+# (phrase, category, severity). Phrases are written in canonical words, see
+# SYNONYMS / FILLER below; "block" hits are definite, "suspect" ones still go
+# to the LLM check. Phrases that also turn up in ordinary calendar requests
+# ("forget my previous instructions, make it 3pm", "share the prior guidelines
+# with new hires") are only suspect, and block only next to an exfiltration
+# target such as the system prompt or hidden instructions.
+SIGNATURES = [
+    ("ignore previous instructions", "instruction_override", "suspect"),
+    ("ignore instructions and", "instruction_override", "suspect"),
+    ("ignore system prompt", "instruction_override", "block"),
+    ("override instructions", "instruction_override", "suspect"),
+    ("new instructions", "instruction_override", "suspect"),
+    ("from now on you", "instruction_override", "suspect"),
+    ("reveal system prompt", "prompt_exfiltration", "block"),
+    ("reveal hidden instructions", "prompt_exfiltration", "block"),
+    ("reveal previous instructions", "prompt_exfiltration", "suspect"),
+    ("reveal initial instructions", "prompt_exfiltration", "suspect"),
+    ("system prompt", "exfiltration_target", "suspect"),
+    ("hidden instructions", "exfiltration_target", "suspect"),
+    ("hidden prompt", "exfiltration_target", "suspect"),
+    ("you are now dan", "role_hijack", "block"),
+    ("do anything now", "role_hijack", "suspect"),
+    ("developer mode enabled", "role_hijack", "block"),
+    ("enter developer mode", "role_hijack", "block"),
+    ("jailbreak", "role_hijack", "suspect"),
+    ("no restrictions", "role_hijack", "suspect"),
+    ("pretend you are", "role_hijack", "suspect"),
+    ("you are no longer", "role_hijack", "suspect"),
+    ("im start system", "delimiter_injection", "block"),
+    ("end system prompt", "delimiter_injection", "block"),
+    ("begin system prompt", "delimiter_injection", "block"),
+    ("system override", "delimiter_injection", "suspect"),
+    ("admin override", "delimiter_injection", "suspect"),
+]
+
+# word → canonical word
+SYNONYMS = {
+    "disregard": "ignore", "forget": "ignore", "bypass": "ignore", "skip": "ignore", "neglect": "ignore",
+    "ignoring": "ignore", "ignores": "ignore",
+    "prior": "previous", "earlier": "previous", "preceding": "previous", "above": "previous", "former": "previous",
+    "instruction": "instructions", "rules": "instructions", "rule": "instructions", "directions": "instructions",
+    "guidelines": "instructions", "directives": "instructions", "prompts": "instructions", "commands": "instructions",
+    "output": "reveal", "print": "reveal", "show": "reveal", "display": "reveal", "repeat": "reveal",
+    "leak": "reveal", "dump": "reveal", "tell": "reveal", "give": "reveal", "share": "reveal",
+    "secret": "hidden", "original": "initial",
+    "message": "prompt",
+    "whats": "what",
+    "limits": "restrictions", "filters": "restrictions",
+    "enable": "enabled", "activated": "enabled",
+}
+# suspect hits that are definite together
+BLOCKING_COMBINATIONS = [
+    {"instruction_override", "exfiltration_target"},
+    {"prompt_exfiltration", "exfiltration_target"},
+    {"delimiter_injection", "exfiltration_target"},
+    {"delimiter_injection", "instruction_override"},
+]
+FILLER = {"all", "the", "any", "your", "my", "of", "me", "us", "these", "those", "to", "please", "just"}
+
+# normalization tables
+
+_ZERO_WIDTH = "\u200b\u200c\u200d\u2060\ufeff\u00ad"
+_HOMOGLYPHS = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p",
+    "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ј": "j", "ѕ": "s", "ԁ": "d", "ӏ": "l",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t",
+    "υ": "u", "χ": "x", "ς": "s",
+    # leetspeak
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s",
+}
+_TRANSLATE = str.maketrans({**dict.fromkeys(_ZERO_WIDTH, None), **_HOMOGLYPHS})
+
+# byte table for the (common) ASCII path: lowercase, undo leetspeak, and turn
+# every other byte into a separator
+_ASCII_TABLE = bytes(
+    ord(_HOMOGLYPHS.get(chr(b).lower(), chr(b).lower())) if chr(b).isascii() and (chr(b).isalnum() or chr(b) in _HOMOGLYPHS) else ord(" ")
+    for b in range(256)
+)
+
+def normalize(text: str) -> list[bytes]:
+    """Lowercase ASCII words with homoglyphs, spacing and invisible characters undone"""
+    if text.isascii():
+        data = text.encode("ascii")
+    else:
+        text = unicodedata.normalize("NFKC", text).casefold().translate(_TRANSLATE)
+        data = text.encode("ascii", "replace")
+    words = data.translate(_ASCII_TABLE).split(b" ")
+
+    # re-join letters spread out like "i g n o r e" or "i.g.n.o.r.e"; a double
+    # separator leaves an empty item, which ends the run
+    joined, run = [], []
+    for word in words:
+        if len(word) == 1:
+            run.append(word)
+            continue
+        if run:
+            joined.extend([b"".join(run)] if len(run) > 2 else run)
+            run = []
+        if word:
+            joined.append(word)
+    if run:
+        joined.extend([b"".join(run)] if len(run) > 2 else run)
+    return joined
+
+# matcher
+
+class Match(NamedTuple):
+    phrase: str
+    category: str
+    severity: str
+
+
+class InjectionScanner:
+    """Aho-Corasick automaton over canonical word symbols"""
+
+    _SKIP = -1
+
+    def __init__(self, signatures: list[tuple[str, str, str]] = SIGNATURES):
+        self.signatures = [Match(*signature) for signature in signatures]
+        self.scanned = 0
+        self.blocked = 0
+        self.suspected = 0
+        self._build()
+
+    def _symbol_table(self) -> dict[bytes, int]:
+        symbols: dict[str, int] = {}
+        for signature in self.signatures:
+            for word in signature.phrase.split():
+                symbols.setdefault(word, len(symbols))
+        table = dict(symbols)
+        for word, canonical in SYNONYMS.items():
+            if canonical in symbols:
+                table[word] = symbols[canonical]
+        for word in FILLER:
+            table.setdefault(word, self._SKIP)
+        return {word.encode("ascii"): symbol for word, symbol in table.items()}
+
+    def _build(self):
+        self._symbols = self._symbol_table()
+        self._max_word = max(len(word) for word in self._symbols)
+
+        # trie
+        goto: list[dict[int, int]] = [{}]
+        outputs: list[list[int]] = [[]]
+        for index, signature in enumerate(self.signatures):
+            state = 0
+            for word in signature.phrase.split():
+                symbol = self._symbols[word.encode("ascii")]
+                if symbol not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][symbol] = len(goto) - 1
+                state = goto[state][symbol]
+            outputs[state].append(index)
+
+        # failure links, folded into a full transition table (a DFA)
+        fail = [0] * len(goto)
+        delta: list[dict[int, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for symbol, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(symbol, 0)
+                queue.append(child)
+        self._delta = delta
+        self._outputs = outputs
+
+    def scan(self, text: str) -> list[Match]:
+        """Every signature found in the text"""
+        symbols, delta, outputs = self._symbols, self._delta, self._outputs
+        state = 0
+        found = []
+        for word in normalize(text):
+            symbol = symbols.get(word)
+            if symbol is None:
+                pieces = self._segment(word) if len(word) > self._max_word else None
+                if pieces is None:
+                    state = 0
+                    continue
+            else:
+                pieces = (symbol,)
+            for symbol in pieces:
+                if symbol == self._SKIP:
+                    continue
+                state = delta[state].get(symbol, 0)
+                if outputs[state]:
+                    found.extend(outputs[state])
+        return [self.signatures[i] for i in dict.fromkeys(found)]
+
+    def _segment(self, word: bytes) -> Optional[list[int]]:
+        """Split run-together words ("ignorepreviousinstructions") into known symbols"""
+        symbols, longest = self._symbols, self._max_word
+        best: list[Optional[list[int]]] = [None] * (len(word) + 1)
+        best[0] = []
+        for end in range(1, len(word) + 1):
+            for start in range(max(0, end - longest), end):
+                if best[start] is not None and word[start:end] in symbols:
+                    best[end] = best[start] + [symbols[word[start:end]]]
+                    break
+        return best[-1]
+
+    def check(self, text: str) -> Optional[list[str]]:
+        """Risk flags on a definite hit, None when the LLM check should decide"""
+        self.scanned += 1
+        matches = self.scan(text)
+        if not matches:
+            return None
+        categories = {m.category for m in matches}
+        if any(m.severity == "block" for m in matches) or any(c <= categories for c in BLOCKING_COMBINATIONS):
+            self.blocked += 1
+            return [f"{m.category}: {m.phrase}" for m in matches]
+        self.suspected += 1
+        logger.info(f"Suspect signatures, deferring to LLM check: {[m.phrase for m in matches]}")
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "scanned": self.scanned,
+            "blocked": self.blocked,
+            "suspected": self.suspected,
+            "llm_calls_saved": self.blocked,
+        }
@@ -0,0 +1,71 @@
+# ------------------------------------------------------------------------------
+# Latency / Token / Cost Metrics for LLM Calls
+# ------------------------------------------------------------------------------
+
+# Small recorder shared by the scaling helpers in this folder so every pattern
+# reports the same numbers: calls, p50 / p95 latency, tokens and cost per label
+# (a tier, a worker, a workflow step, ...).
+
+
+from collections import defaultdict
+from typing import Optional
+
+from deployment_pool import percentile
+
+# Price per 1k tokens (input, output) for common Azure OpenAI models, used when
+# a caller doesn't pass its own pricing.
+DEFAULT_PRICES = {
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+
+
+def usage_cost(usage, input_cost_per_1k: float, output_cost_per_1k: float) -> float:
+    """Cost of one call from its usage block (object or dict)"""
+    if usage is None:
+        return 0.0
+    prompt_tokens = _usage_field(usage, "prompt_tokens")
+    completion_tokens = _usage_field(usage, "completion_tokens")
+    return prompt_tokens / 1000 * input_cost_per_1k + completion_tokens / 1000 * output_cost_per_1k
+
+def _usage_field(usage, name: str) -> int:
+    if isinstance(usage, dict):
+        return usage.get(name) or 0
+    return getattr(usage, name, 0) or 0
+
+
+class CallMetrics:
+    """Accumulate latency, tokens and cost per label"""
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._tokens = defaultdict(lambda: [0, 0])
+        self._cost = defaultdict(float)
+
+    def record(self, label: str, latency: float, usage=None, cost: Optional[float] = None):
+        self._latencies[label].append(latency)
+        if usage is not None:
+            self._tokens[label][0] += _usage_field(usage, "prompt_tokens")
+            self._tokens[label][1] += _usage_field(usage, "completion_tokens")
+        if cost:
+            self._cost[label] += cost
+
+    def total_cost(self) -> float:
+        return sum(self._cost.values())
+
+    def total_tokens(self) -> int:
+        return sum(prompt + completion for prompt, completion in self._tokens.values())
+
+    def summary(self) -> dict:
+        return {
+            label: {
+                "calls": len(latencies),
+                "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "prompt_tokens": self._tokens[label][0],
+                "completion_tokens": self._tokens[label][1],
+                "cost": round(self._cost[label], 6),
+            }
+            for label, latencies in self._latencies.items()
+        }
@@ -0,0 +1,308 @@
+# ------------------------------------------------------------------------------
+# Local Stand-in for an Azure OpenAI Deployment
+# ------------------------------------------------------------------------------
+
+# Serves just enough of the Azure OpenAI REST surface for AzureOpenAI /
+# AsyncAzureOpenAI to talk to it:
+#
+#   POST /openai/deployments/{deployment}/chat/completions
+#   POST /openai/files                  (multipart upload, purpose=batch)
+#   GET  /openai/files/{id}/content
+#   POST /openai/batches
+#   GET  /openai/batches/{id}
+#
+# Every chat response is delayed according to a LatencyProfile, and a share
+# of them can be answered with an error status (429 by default) instead, so
+# several stand-ins with different profiles can play the part of fast, slow or
+# throttled deployments when benchmarking the helpers in this folder without a
+# real endpoint. Batches are worked off in the background with
+# batch_concurrency requests in flight, after a fixed validation delay.
+
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+# latency model
+
+@dataclass
+class LatencyProfile:
+    """Log-normal latency around a median with occasional long stalls and errors"""
+
+    median_ms: float
+    jitter: float = 0.25  # sigma of the log-normal
+    stall_rate: float = 0.0  # fraction of requests that stall
+    stall_ms: float = 0.0  # extra delay added to a stalled request
+    error_rate: float = 0.0  # fraction of requests answered with error_status
+    error_status: int = 429
+    error_ms: float = 5.0  # errors come back fast, like a real throttle
+
+    def sample(self, rng: random.Random) -> float:
+        """Return one request latency in seconds"""
+        latency_ms = self.median_ms * rng.lognormvariate(0.0, self.jitter)
+        if self.stall_rate and rng.random() < self.stall_rate:
+            latency_ms += self.stall_ms
+        return latency_ms / 1000.0
+
+class StandInError(Exception):
+    """A chat request the profile decided to fail"""
+
+    def __init__(self, status: int):
+        super().__init__(f"stand-in returned {status}")
+        self.status = status
+
+# response helpers
+
+def chat_completion(model: str, content: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    """Build a chat.completion payload the openai client can deserialize"""
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content, "refusal": None},
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+def default_responder(deployment: str, body: dict) -> str:
+    """Answer every request with a short fixed message"""
+    return f"OK from {deployment}"
+
+# server
+
+_CHAT_PATH = re.compile(r"^/openai/deployments/(?P<deployment>[^/?]+)/chat/completions")
+_FILES_PATH = re.compile(r"^/openai/files(?:\?|$)")
+_FILE_CONTENT_PATH = re.compile(r"^/openai/files/(?P<file_id>[^/?]+)/content")
+_BATCHES_PATH = re.compile(r"^/openai/batches(?:\?|$)")
+_BATCH_PATH = re.compile(r"^/openai/batches/(?P<batch_id>[^/?]+)(?:\?|$)")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real endpoint
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.server.stand_in.handle_post(self, self.rfile.read(length))
+
+    def do_GET(self):
+        self.server.stand_in.handle_get(self)
+
+    def send_json(self, status: int, payload: dict):
+        self.send_bytes(status, json.dumps(payload).encode(), "application/json")
+
+    def send_bytes(self, status: int, data: bytes, content_type: str = "application/octet-stream"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def not_found(self):
+        self.send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output readable
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):  # broken pipe, connection reset
+            return  # client hung up, e.g. the losing call of a hedge was cancelled
+        super().handle_error(request, client_address)
+
+
+class StandInServer:
+    """One local deployment with its own latency profile"""
+
+    def __init__(
+        self,
+        name: str,
+        profile: LatencyProfile,
+        responder: Optional[Callable[[str, dict], str]] = None,
+        seed: Optional[int] = None,
+        batch_concurrency: int = 32,
+        batch_validation_seconds: float = 0.5,
+    ):
+        self.name = name
+        self.profile = profile
+        self.responder = responder or default_responder
+        self.batch_concurrency = batch_concurrency
+        self.batch_validation_seconds = batch_validation_seconds
+        self.requests_served = 0
+        self.files: dict[str, dict] = {}
+        self.batches: dict[str, dict] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _Server(("127.0.0.1", 0), _Handler)
+        self._httpd.stand_in = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle_post(self, handler: _Handler, raw: bytes):
+        """Route a POST to the matching endpoint"""
+        match = _CHAT_PATH.match(handler.path)
+        if match:
+            body = json.loads(raw or b"{}")
+            try:
+                handler.send_json(200, self._chat_completion(match.group("deployment"), body))
+            except StandInError as e:
+                code = "429" if e.status == 429 else "InternalServerError"
+                handler.send_json(e.status, {"error": {"code": code, "message": str(e)}})
+        elif _FILES_PATH.match(handler.path):
+            handler.send_json(200, self._upload_file(handler.headers.get("Content-Type", ""), raw))
+        elif _BATCHES_PATH.match(handler.path):
+            handler.send_json(200, self._create_batch(json.loads(raw)))
+        else:
+            handler.not_found()
+
+    def handle_get(self, handler: _Handler):
+        """Route a GET to the matching endpoint"""
+        content = _FILE_CONTENT_PATH.match(handler.path)
+        batch = _BATCH_PATH.match(handler.path)
+        if content and content.group("file_id") in self.files:
+            handler.send_bytes(200, self.files[content.group("file_id")]["content"])
+        elif batch and batch.group("batch_id") in self.batches:
+            with self._lock:
+                current = self.batches[batch.group("batch_id")]
+                payload = {**current, "request_counts": dict(current["request_counts"])}
+            handler.send_json(200, payload)
+        else:
+            handler.not_found()
+
+    # chat completions
+
+    def _chat_completion(self, deployment: str, body: dict) -> dict:
+        with self._lock:
+            delay = self.profile.sample(self._rng)
+            failed = self.profile.error_rate and self._rng.random() < self.profile.error_rate
+            self.requests_served += 1
+        if failed:
+            time.sleep(self.profile.error_ms / 1000.0)
+            raise StandInError(self.profile.error_status)
+        time.sleep(delay)
+
+        content = self.responder(deployment, body)
+        prompt_tokens = estimate_tokens(json.dumps(body.get("messages", [])))
+        return chat_completion(deployment, content, prompt_tokens, estimate_tokens(content))
+
+    # files and batches
+
+    def _store_file(self, content: bytes, filename: str, purpose: str) -> dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        meta = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        self.files[file_id] = {**meta, "content": content}
+        return meta
+
+    def _upload_file(self, content_type: str, raw: bytes) -> dict:
+        message = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + raw
+        )
+        fields, content, filename = {}, b"", "upload.jsonl"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                content = part.get_payload(decode=True)
+                filename = part.get_filename() or filename
+            else:
+                fields[name] = part.get_content().strip()
+        return self._store_file(content, filename, fields.get("purpose", "batch"))
+
+    def _create_batch(self, body: dict) -> dict:
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        lines = self.files[body["input_file_id"]]["content"].decode().splitlines()
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }
+        self.batches[batch_id] = batch
+        threading.Thread(target=self._run_batch, args=(batch_id, lines), daemon=True).start()
+        return dict(batch)
+
+    def _run_batch(self, batch_id: str, lines: list[str]):
+        batch = self.batches[batch_id]
+        time.sleep(self.batch_validation_seconds)
+        with self._lock:
+            batch["status"] = "in_progress"
+            batch["in_progress_at"] = int(time.time())
+
+        def run_line(line: str) -> str:
+            request = json.loads(line)
+            body = request["body"]
+            try:
+                response = {"status_code": 200, "request_id": uuid.uuid4().hex, "body": self._chat_completion(body["model"], body)}
+                error = None
+            except Exception as e:  # a failing line must not sink the whole batch
+                response, error = None, {"code": "server_error", "message": str(e)}
+            with self._lock:
+                batch["request_counts"]["failed" if error else "completed"] += 1
+            return json.dumps({"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": request["custom_id"], "response": response, "error": error})
+
+        with ThreadPoolExecutor(self.batch_concurrency) as executor:
+            output = list(executor.map(run_line, lines))
+
+        output_file = self._store_file("\n".join(output).encode(), f"{batch_id}_output.jsonl", "batch_output")
+        with self._lock:
+            batch["output_file_id"] = output_file["id"]
+            batch["status"] = "completed"
+            batch["completed_at"] = int(time.time())
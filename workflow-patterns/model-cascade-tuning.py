@@ -0,0 +1,45 @@
+# ------------------------------------------------------------------------------
+# Tune the Model Cascade Uncertainty Band from Logged Outcomes
+# ------------------------------------------------------------------------------
+
+# Run the workflows with cascade logging and some shadow traffic, e.g.
+#
+#   AZURE_CASCADE_LOG=cascade.jsonl AZURE_CASCADE_SHADOW_RATE=0.1 python workflow-patterns/routing-pattern.py
+#
+# then point this script at the log. It replays every request where both the
+# small and the large model answered and prints the band with the lowest
+# escalation rate that still agrees with the large model's decisions. Shadow
+# samples are weighted by 1/shadow_rate so the rates reflect all traffic.
+
+
+import logging
+import os
+import sys
+
+from model_cascade import DEFAULT_BAND, escalation_rate, load_outcomes, tune_band
+
+# Set up logging configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+log_path = sys.argv[1] if len(sys.argv) > 1 else os.getenv("AZURE_CASCADE_LOG", "cascade.jsonl")
+target_agreement = float(sys.argv[2]) if len(sys.argv) > 2 else 0.99
+
+outcomes = load_outcomes(log_path)
+logger.info(f"Loaded {len(outcomes)} outcomes with both tiers from {log_path}")
+
+current = os.getenv("AZURE_CASCADE_BAND")
+current_band = tuple(float(x) for x in current.split(",")) if current else DEFAULT_BAND
+current_escalation = escalation_rate(outcomes, current_band)
+
+best = tune_band(outcomes, target_agreement=target_agreement)
+print(f"Current band {current_band}: escalation rate {current_escalation:.1%}")
+print(
+    f"Tuned band {best['band']}: escalation rate {best['escalation_rate']:.1%}, "
+    f"agreement with large model {best['agreement']:.1%}"
+)
+print(f"AZURE_CASCADE_BAND={best['band'][0]},{best['band'][1]}")
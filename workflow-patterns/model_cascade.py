@@ -0,0 +1,359 @@
+# ------------------------------------------------------------------------------
+# Confidence-Driven Model Cascade
+# ------------------------------------------------------------------------------
+
+# Structured Call ────────────────────────────────┐
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 1: Small / Fast Model                   │
+# │  - Same messages and response_format          │
+# │  - Read confidence_score from the result      │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Gate Check: Escalate?                        │
+# │  - Refusal / empty parse → escalate           │
+# │  - Caller validation fails → escalate         │
+# │  - low <= confidence < high → escalate        │
+# │  - Else → keep the small model's answer       │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 2: Large Model (only when escalated)    │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Final Output:                                │
+# │  - Parsed result of the last tier that ran    │
+# │  - Escalation / latency / cost stats, and a   │
+# │    JSONL log used to tune the band            │
+# └───────────────────────────────────────────────┘
+#
+# The uncertainty band sits around the 0.7 gate the workflows already use:
+# far below it or far above it the small model's answer leads to the same
+# decision the large model would make, so only the middle is escalated.
+# model-cascade-tuning.py picks the narrowest band that keeps the decisions
+# in agreement with the large model, using outcomes logged here.
+# ModelCascade.from_env takes the small tier from AZURE_SMALL_DEPLOYMENT_NAME;
+# without it every call goes straight to AZURE_DEPLOYMENT_NAME.
+
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, NamedTuple, Optional
+import json
+import logging
+import os
+import asyncio
+import random
+import threading
+import time
+
+from llm_metrics import DEFAULT_PRICES, CallMetrics, usage_cost
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BAND = (0.5, 0.9)
+
+# data model
+
+@dataclass
+class CascadeTier:
+    """One model in the cascade, cheapest first"""
+
+    name: str
+    model: str
+    input_cost_per_1k: float = 0.0
+    output_cost_per_1k: float = 0.0
+    pool: Any = None  # optional DeploymentPool, async calls only
+
+
+class Outcome(NamedTuple):
+    """One logged request where both tiers answered, for tuning"""
+
+    confidence: Optional[float]  # small tier, None if it gave no parse
+    small: Any  # label of the small tier's answer
+    large: Any  # label of the large tier's answer
+    weight: float  # production requests this record stands for
+    forced: bool  # escalated whatever the band (unparsed, validation failed)
+
+
+def confidence_score(result) -> float:
+    return result.confidence_score
+
+def tier_prices(deployment: Optional[str], env_var: str) -> tuple[float, float]:
+    """
+    Price per 1k tokens (input, output) for a deployment: "input,output" from
+    env_var, else DEFAULT_PRICES for the longest model name the deployment
+    starts with, else zero with a warning.
+    """
+    configured = os.getenv(env_var)
+    if configured:
+        input_cost, output_cost = (float(x) for x in configured.split(","))
+        return input_cost, output_cost
+    matches = [name for name in DEFAULT_PRICES if deployment and deployment.startswith(name)]
+    if matches:
+        return DEFAULT_PRICES[max(matches, key=len)]
+    logger.warning(f"No price known for deployment {deployment!r}; set {env_var}=input,output per 1k tokens")
+    return 0.0, 0.0
+
+# cascade
+
+class ModelCascade:
+    """Answer with the small model, escalate uncertain or invalid results"""
+
+    def __init__(
+        self,
+        client,
+        tiers: list[CascadeTier],
+        uncertainty_band: tuple[float, float] = DEFAULT_BAND,
+        log_path: Optional[str] = None,
+        shadow_rate: float = 0.0,
+    ):
+        if not tiers:
+            raise ValueError("ModelCascade needs at least one tier")
+        self.client = client
+        self.tiers = tiers
+        self.uncertainty_band = uncertainty_band
+        self.log_path = log_path
+        self.shadow_rate = shadow_rate  # fraction of kept answers also sent to the last tier for tuning
+        self.metrics = CallMetrics()
+        self.requests = 0
+        self.escalations = Counter()
+        self._log_lock = threading.Lock()
+        self._shadow_tasks: set = set()  # keeps background shadow calls referenced until done
+
+    @classmethod
+    def from_env(cls, client, pool=None, **kwargs) -> "ModelCascade":
+        """
+        Small tier from AZURE_SMALL_DEPLOYMENT_NAME, large tier from
+        AZURE_DEPLOYMENT_NAME, priced with AZURE_SMALL_DEPLOYMENT_PRICES /
+        AZURE_DEPLOYMENT_PRICES or DEFAULT_PRICES. Without a small deployment
+        the cascade is a single tier and behaves like a plain call.
+        """
+        tiers = []
+        small = os.getenv("AZURE_SMALL_DEPLOYMENT_NAME")
+        if small:
+            tiers.append(CascadeTier("small", small, *tier_prices(small, "AZURE_SMALL_DEPLOYMENT_PRICES")))
+        large = os.getenv("AZURE_DEPLOYMENT_NAME")
+        tiers.append(CascadeTier("large", large, *tier_prices(large, "AZURE_DEPLOYMENT_PRICES"), pool=pool))
+
+        band = os.getenv("AZURE_CASCADE_BAND")  # e.g. "0.55,0.85" from model-cascade-tuning.py
+        if band:
+            kwargs.setdefault("uncertainty_band", tuple(float(x) for x in band.split(",")))
+        kwargs.setdefault("log_path", os.getenv("AZURE_CASCADE_LOG"))
+        kwargs.setdefault("shadow_rate", float(os.getenv("AZURE_CASCADE_SHADOW_RATE", "0")))
+        return cls(client, tiers, **kwargs)
+
+    def escalation_reason(self, result, confidence: Callable, validate: Optional[Callable]) -> Optional[str]:
+        """Why this result should go to the next tier, or None to keep it"""
+        if result is None:
+            return "unparsed"
+        if validate is not None and not validate(result):
+            return "validation_failed"
+        low, high = self.uncertainty_band
+        if low <= confidence(result) < high:
+            return "uncertain"
+        return None
+
+    def parse(
+        self,
+        messages: list,
+        response_format,
+        confidence: Callable = confidence_score,
+        validate: Optional[Callable] = None,
+        label: Optional[Callable] = None,
+    ):
+        """Synchronous cascade over client.beta.chat.completions.parse"""
+        attempts = []
+        for index, tier in enumerate(self.tiers):
+            start = time.perf_counter()
+            completion = self.client.beta.chat.completions.parse(
+                model=tier.model, messages=messages, response_format=response_format
+            )
+            reason = self._record(attempts, tier, completion, time.perf_counter() - start, confidence, validate, label)
+            if reason is None or index == len(self.tiers) - 1:
+                break
+
+        # the shadow call runs in the background, the answer goes back right away
+        shadow = self._should_shadow(attempts)
+        result = self._finish(attempts, log=not shadow)
+        if shadow:
+            threading.Thread(
+                target=self._shadow,
+                args=(attempts, messages, response_format, confidence, validate, label),
+                daemon=True,
+            ).start()
+        return result
+
+    async def aparse(
+        self,
+        messages: list,
+        response_format,
+        confidence: Callable = confidence_score,
+        validate: Optional[Callable] = None,
+        label: Optional[Callable] = None,
+    ):
+        """Async cascade; tiers with a pool are called through it"""
+        attempts = []
+        for index, tier in enumerate(self.tiers):
+            start = time.perf_counter()
+            completion = await self._acall(tier, messages, response_format)
+            reason = self._record(attempts, tier, completion, time.perf_counter() - start, confidence, validate, label)
+            if reason is None or index == len(self.tiers) - 1:
+                break
+
+        shadow = self._should_shadow(attempts)
+        result = self._finish(attempts, log=not shadow)
+        if shadow:
+            task = asyncio.create_task(self._ashadow(attempts, messages, response_format, confidence, validate, label))
+            self._shadow_tasks.add(task)
+            task.add_done_callback(self._shadow_tasks.discard)
+        return result
+
+    def _shadow(self, attempts, messages, response_format, confidence, validate, label):
+        """Large-tier answer for a kept request, logged for tuning only"""
+        tier = self.tiers[-1]
+        start = time.perf_counter()
+        try:
+            completion = self.client.beta.chat.completions.parse(
+                model=tier.model, messages=messages, response_format=response_format
+            )
+        except Exception as e:
+            logger.warning(f"Shadow call failed: {e}")
+            return
+        self._record(attempts, tier, completion, time.perf_counter() - start, confidence, validate, label, shadow=True)
+        self._log(attempts)
+
+    async def _ashadow(self, attempts, messages, response_format, confidence, validate, label):
+        tier = self.tiers[-1]
+        start = time.perf_counter()
+        try:
+            completion = await self._acall(tier, messages, response_format)
+        except Exception as e:
+            logger.warning(f"Shadow call failed: {e}")
+            return
+        self._record(attempts, tier, completion, time.perf_counter() - start, confidence, validate, label, shadow=True)
+        self._log(attempts)
+
+    async def _acall(self, tier: CascadeTier, messages: list, response_format):
+        if tier.pool is not None:
+            return await tier.pool.call(
+                lambda client, model: client.beta.chat.completions.parse(
+                    model=model, messages=messages, response_format=response_format
+                )
+            )
+        return await self.client.beta.chat.completions.parse(
+            model=tier.model, messages=messages, response_format=response_format
+        )
+
+    def _record(self, attempts, tier, completion, latency, confidence, validate, label, shadow=False) -> Optional[str]:
+        result = completion.choices[0].message.parsed
+        reason = self.escalation_reason(result, confidence, validate)
+        cost = usage_cost(completion.usage, tier.input_cost_per_1k, tier.output_cost_per_1k)
+        self.metrics.record(f"{tier.name} (shadow)" if shadow else tier.name, latency, completion.usage, cost)
+        attempts.append(
+            {
+                "tier": tier.name,
+                "result": result,
+                "confidence": confidence(result) if result is not None else None,
+                "label": label(result) if label is not None and result is not None else None,
+                "reason": reason,
+                "latency": round(latency, 4),
+                "cost": cost,
+                "shadow": shadow,
+            }
+        )
+        return reason
+
+    def _should_shadow(self, attempts) -> bool:
+        return len(self.tiers) > 1 and len(attempts) == 1 and random.random() < self.shadow_rate
+
+    def _finish(self, attempts, log: bool = True):
+        served = [a for a in attempts if not a["shadow"]]
+        self.requests += 1
+        for attempt in served[:-1]:
+            self.escalations[attempt["reason"]] += 1
+        if len(served) > 1:
+            logger.info(f"Cascade escalated {served[0]['tier']} -> {served[-1]['tier']} ({served[0]['reason']})")
+
+        if log:
+            self._log(attempts)
+        return served[-1]["result"]
+
+    def _log(self, attempts):
+        if self.log_path:
+            record = [{k: v for k, v in a.items() if k != "result"} for a in attempts]
+            with self._log_lock, open(self.log_path, "a") as f:
+                f.write(json.dumps({"ts": time.time(), "shadow_rate": self.shadow_rate, "attempts": record}) + "\n")
+
+    def stats(self) -> dict:
+        """Escalation rate, reasons, and per-tier latency / cost"""
+        escalated = sum(self.escalations.values())
+        return {
+            "requests": self.requests,
+            "escalations": escalated,
+            "escalation_rate": round(escalated / self.requests, 3) if self.requests else 0.0,
+            "reasons": dict(self.escalations),
+            "total_cost": round(self.metrics.total_cost(), 6),
+            "tiers": self.metrics.summary(),
+        }
+
+# tuning
+
+def load_outcomes(log_path: str) -> list[Outcome]:
+    """
+    An Outcome for every logged request where both tiers ran. Escalated
+    requests are all logged, kept ones only at shadow_rate, so a shadow sample
+    stands for 1/shadow_rate requests of production traffic. Requests escalated
+    as unparsed or validation_failed are forced: every band escalates them.
+    """
+    outcomes = []
+    with open(log_path) as f:
+        for line in f:
+            record = json.loads(line)
+            attempts = record["attempts"]
+            if len(attempts) < 2:
+                continue
+            shadow_rate = record.get("shadow_rate") or 1.0
+            weight = 1 / shadow_rate if attempts[-1].get("shadow") else 1.0
+            forced = attempts[0]["reason"] in ("unparsed", "validation_failed")
+            outcomes.append(
+                Outcome(attempts[0]["confidence"], attempts[0]["label"], attempts[-1]["label"], weight, forced)
+            )
+    return outcomes
+
+def escalates(outcome: Outcome, band: tuple[float, float]) -> bool:
+    low, high = band
+    return outcome.forced or low <= outcome.confidence < high
+
+def escalation_rate(outcomes: list[Outcome], band: tuple[float, float]) -> float:
+    """Weighted share of the logged traffic a band would escalate"""
+    total = sum(o.weight for o in outcomes)
+    return sum(o.weight for o in outcomes if escalates(o, band)) / total
+
+def tune_band(outcomes: list[Outcome], target_agreement: float = 0.99, step: float = 0.05) -> dict:
+    """
+    Narrowest (lowest escalation) band whose decisions agree with the large
+    model on at least target_agreement of the logged outcomes, weighted back to
+    production traffic. Decisions inside the band take the large model's
+    label, outside it the small model's.
+    """
+    if not outcomes:
+        raise ValueError("No outcomes with both tiers logged; run with shadow_rate > 0 first")
+
+    total = sum(o.weight for o in outcomes)
+    edges = [round(i * step, 4) for i in range(int(round(1 / step)) + 2)]
+    best = None
+    for low in edges:
+        for high in edges:
+            if high < low:
+                continue
+            inside = [escalates(o, (low, high)) for o in outcomes]
+            agreement = sum(o.weight for o, esc in zip(outcomes, inside) if esc or o.small == o.large) / total
+            escalation = sum(o.weight for o, esc in zip(outcomes, inside) if esc) / total
+            if agreement < target_agreement:
+                continue
+            if best is None or escalation < best["escalation_rate"]:
+                best = {"band": (low, high), "agreement": round(agreement, 4), "escalation_rate": round(escalation, 4)}
+    return best
@@ -0,0 +1,456 @@
+# ------------------------------------------------------------------------------
+# Orchestrator-Workers Pattern for Large Multi-Part Requests
+# ------------------------------------------------------------------------------
+
+# User Input ─────────────────────────────────────┐
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 1: Orchestrator Plans Subtasks          │
+# │  - LLM breaks the request into independent    │
+# │    subtasks (structured output)               │
+# │  - Subtasks go onto a shared work queue       │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 2: Bounded Worker Pool                  │
+# │  - N workers pull subtasks from the queue     │
+# │  - Each result is pushed to the synthesizer   │
+# │    as soon as it is done                      │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Budget Check (global tokens / wall time)     │
+# │  - Every call holds its token cap up front,   │
+# │    so calls in flight can't eat the reserve   │
+# │  - Budget spent → cancel queued subtasks,     │
+# │    in-flight calls stop at the deadline       │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 3: Streaming Synthesizer                │
+# │  - Folds results into a running draft while   │
+# │    the other workers are still busy           │
+# │  - Results arriving during a merge are        │
+# │    batched into the next one                  │
+# │  - No merges once the budget is spent; the    │
+# │    reserve pays for one final merge           │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Final Output:                                │
+# │  - Synthesized answer + skipped subtasks      │
+# │  - Latency / token / cost per step            │
+# └───────────────────────────────────────────────┘
+
+
+from dataclasses import dataclass, field
+from typing import Optional
+from pydantic import BaseModel, Field
+from openai import AsyncAzureOpenAI
+import asyncio
+import logging
+import time
+from dotenv import load_dotenv
+
+from deployment_pool import DeploymentPool
+from llm_metrics import DEFAULT_PRICES, CallMetrics, usage_cost
+
+# Set up logging configuration
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# same pooled, hedged deployments as the parallelization pattern
+pool = DeploymentPool.from_env(AsyncAzureOpenAI, hedge=True)
+metrics = CallMetrics()
+input_cost_per_1k, output_cost_per_1k = DEFAULT_PRICES["gpt-4o"]
+
+WORKER_CONCURRENCY = 4
+PLAN_MAX_TOKENS = 2000  # output token caps per call
+WORKER_MAX_TOKENS = 1500
+SYNTHESIS_MAX_TOKENS = 3000
+MIN_OUTPUT_TOKENS = 256  # smaller caps would only produce truncated output
+DONE = object()  # end of the results queue; a refused call's parsed result is None
+
+# data models
+
+class Subtask(BaseModel):
+    """One independent piece of the request"""
+
+    id: int = Field(description="Sequential id starting at 1")
+    title: str = Field(description="Short title of the subtask")
+    instructions: str = Field(description="Self-contained instructions for a worker")
+
+
+class TaskPlan(BaseModel):
+    """Orchestrator LLM call: break the request into subtasks"""
+
+    goal: str = Field(description="One sentence summary of what the user wants")
+    subtasks: list[Subtask] = Field(description="Independent subtasks that together answer the request")
+
+
+class WorkerResult(BaseModel):
+    """Worker LLM call: result for a single subtask"""
+
+    subtask_id: int = Field(description="Id of the subtask this answers")
+    result: str = Field(description="Complete result for the subtask")
+
+
+class SynthesisDraft(BaseModel):
+    """Synthesizer LLM call: running answer built from worker results"""
+
+    answer: str = Field(description="Answer to the user's request covering every result so far")
+    covered_subtasks: list[int] = Field(description="Ids of the subtasks included in the answer")
+
+
+@dataclass
+class Budget:
+    """Global token / wall-time budget shared by every call"""
+
+    max_tokens: int
+    max_seconds: float
+    reserve_tokens: int = 0  # kept back for the final synthesis
+    used_tokens: int = 0
+    held_tokens: int = 0  # claimed by calls still in flight
+    started: float = field(default_factory=time.monotonic)
+
+    def claim(self, tokens: int, use_reserve: bool = False) -> int:
+        """Hold up to tokens for one call; the reserve is only handed out with use_reserve"""
+        limit = self.max_tokens - (0 if use_reserve else self.reserve_tokens)
+        granted = max(0, min(tokens, limit - self.used_tokens - self.held_tokens))
+        self.held_tokens += granted
+        return granted
+
+    def settle(self, held: int, usage):
+        """Release a claim and charge what the call actually used"""
+        self.held_tokens -= held
+        if usage is not None:
+            self.used_tokens += usage.total_tokens
+
+    @property
+    def remaining_seconds(self) -> float:
+        return self.max_seconds - (time.monotonic() - self.started)
+
+    @property
+    def exhausted(self) -> bool:
+        """Spent apart from the reserve"""
+        return self.used_tokens >= self.max_tokens - self.reserve_tokens or self.remaining_seconds <= 0
+
+    @property
+    def spent(self) -> bool:
+        """Spent including the reserve"""
+        return self.used_tokens >= self.max_tokens or self.remaining_seconds <= 0
+
+
+@dataclass
+class OrchestratorResult:
+    """Final output of the workflow"""
+
+    answer: Optional[str]
+    completed: list[int]
+    cancelled: list[int]
+    failed: list[int]
+    unmerged: list[int]  # finished, but the budget ran out before they were merged
+    seconds: float
+    tokens: int
+
+
+class BudgetExhausted(Exception):
+    """Not enough budget left to hold a call's token cap"""
+
+# functions
+
+def estimate_prompt_tokens(messages: list) -> int:
+    """Rough prompt size (~4 characters per token) plus the response schema"""
+    return sum(len(m["content"]) // 4 + 4 for m in messages) + 150
+
+async def call_llm(
+    step: str, messages: list, response_format, budget: Budget, max_tokens: int, use_reserve: bool = False
+):
+    """Structured call through the pool, holding its token cap against the budget while in flight"""
+    prompt_tokens = estimate_prompt_tokens(messages)
+    held = budget.claim(prompt_tokens + max_tokens, use_reserve)
+    if held - prompt_tokens < MIN_OUTPUT_TOKENS:
+        budget.settle(held, None)
+        raise BudgetExhausted(f"{step}: {held} tokens left for a {prompt_tokens} token prompt")
+
+    start = time.perf_counter()
+    completion = None
+    try:
+        completion = await pool.call(
+            lambda client, model: client.beta.chat.completions.parse(
+                model=model,
+                messages=messages,
+                response_format=response_format,
+                max_tokens=held - prompt_tokens,
+            )
+        )
+    finally:
+        budget.settle(held, completion.usage if completion else None)
+    metrics.record(
+        step,
+        time.perf_counter() - start,
+        completion.usage,
+        usage_cost(completion.usage, input_cost_per_1k, output_cost_per_1k),
+    )
+    return completion.choices[0].message.parsed
+
+async def plan_subtasks(user_input: str, budget: Budget) -> Optional[TaskPlan]:
+    """Orchestrator LLM call to split the request; None if it was refused or ran out of budget"""
+    logger.info("Planning subtasks")
+    try:
+        plan = await asyncio.wait_for(
+            call_llm(
+                "orchestrator",
+                [
+                    {
+                        "role": "system",
+                        "content": "Break the request into independent subtasks that can be worked on in parallel. Each subtask must be self-contained.",
+                    },
+                    {"role": "user", "content": user_input},
+                ],
+                TaskPlan,
+                budget,
+                max_tokens=PLAN_MAX_TOKENS,
+            ),
+            timeout=budget.remaining_seconds,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Planning stopped at the deadline")
+        return None
+    except BudgetExhausted as e:
+        logger.warning(f"No budget left to plan: {e}")
+        return None
+    if plan is None:
+        logger.warning("Planning got no result (refused)")
+        return None
+    logger.info(f"Planned {len(plan.subtasks)} subtasks for: {plan.goal}")
+    return plan
+
+async def worker(
+    worker_id: int,
+    plan: TaskPlan,
+    queue: asyncio.Queue,
+    results: asyncio.Queue,
+    budget: Budget,
+    cancelled: list[int],
+    failed: list[int],
+):
+    """Pull subtasks until the queue is drained or the budget runs out"""
+    while True:
+        subtask = await queue.get()
+        if subtask is None:
+            return
+
+        if budget.exhausted:
+            cancel_pending(queue, cancelled, subtask)
+            continue
+
+        logger.info(f"Worker {worker_id} started subtask {subtask.id}: {subtask.title}")
+        try:
+            result = await asyncio.wait_for(
+                call_llm(
+                    "worker",
+                    [
+                        {
+                            "role": "system",
+                            "content": f"You are one of several workers on this goal: {plan.goal}. Complete only your subtask.",
+                        },
+                        {"role": "user", "content": f"Subtask {subtask.id}: {subtask.title}\n{subtask.instructions}"},
+                    ],
+                    WorkerResult,
+                    budget,
+                    max_tokens=WORKER_MAX_TOKENS,
+                ),
+                timeout=budget.remaining_seconds,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Worker {worker_id} stopped at the deadline on subtask {subtask.id}")
+            cancel_pending(queue, cancelled, subtask)
+            continue
+        except BudgetExhausted:
+            cancel_pending(queue, cancelled, subtask)
+            continue
+        except Exception as e:  # one failing subtask must not sink the others
+            logger.warning(f"Worker {worker_id} failed on subtask {subtask.id}: {e}")
+            failed.append(subtask.id)
+            continue
+
+        if result is None:
+            logger.warning(f"Worker {worker_id} got no result for subtask {subtask.id} (refused)")
+            failed.append(subtask.id)
+        else:
+            result.subtask_id = subtask.id  # don't trust the id the model echoes back
+            await results.put(result)
+        if budget.exhausted:
+            cancel_pending(queue, cancelled)
+
+def cancel_pending(queue: asyncio.Queue, cancelled: list[int], subtask: Optional[Subtask] = None):
+    """Drop queued subtasks once the budget is spent; stop sentinels stay in the queue"""
+    already = len(cancelled)
+    if subtask is not None:
+        cancelled.append(subtask.id)
+    sentinels = 0
+    while not queue.empty():
+        item = queue.get_nowait()
+        if item is None:
+            sentinels += 1
+        else:
+            cancelled.append(item.id)
+    for _ in range(sentinels):
+        queue.put_nowait(None)
+    if len(cancelled) > already:
+        logger.warning(f"Budget exhausted, cancelled subtasks: {sorted(cancelled[already:])}")
+
+async def merge_results(
+    user_input: str,
+    draft: Optional[SynthesisDraft],
+    batch: list[WorkerResult],
+    budget: Budget,
+    use_reserve: bool = False,
+) -> SynthesisDraft:
+    """Synthesizer LLM call folding new results into the running draft"""
+    logger.info(f"Synthesizing {len(batch)} new results: {[r.subtask_id for r in batch]}")
+    new_results = "\n\n".join(f"Subtask {r.subtask_id}:\n{r.result}" for r in batch)
+    current = draft.answer if draft else "(nothing yet)"
+    merged = await call_llm(
+        "synthesizer",
+        [
+            {
+                "role": "system",
+                "content": "Update the draft answer to the user's request with the new subtask results. Keep everything already in the draft.",
+            },
+            {
+                "role": "user",
+                "content": f"Request: {user_input}\n\nDraft answer:\n{current}\n\nNew results:\n{new_results}",
+            },
+        ],
+        SynthesisDraft,
+        budget,
+        max_tokens=SYNTHESIS_MAX_TOKENS,
+        use_reserve=use_reserve,
+    )
+    merged.covered_subtasks = sorted(set((draft.covered_subtasks if draft else []) + [r.subtask_id for r in batch]))
+    return merged
+
+async def merge_within_budget(
+    user_input: str,
+    draft: Optional[SynthesisDraft],
+    batch: list[WorkerResult],
+    budget: Budget,
+    use_reserve: bool = False,
+) -> Optional[SynthesisDraft]:
+    """merge_results stopped at the deadline; None if it didn't finish"""
+    try:
+        return await asyncio.wait_for(
+            merge_results(user_input, draft, batch, budget, use_reserve), timeout=budget.remaining_seconds
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Synthesizer stopped at the deadline, results not merged: {[r.subtask_id for r in batch]}")
+    except BudgetExhausted as e:
+        logger.info(f"Merge of {[r.subtask_id for r in batch]} held back: {e}")
+    except Exception as e:
+        logger.warning(f"Merge failed for results {[r.subtask_id for r in batch]}: {e}")
+    return None
+
+async def synthesizer(user_input: str, results: asyncio.Queue, budget: Budget) -> tuple[Optional[SynthesisDraft], list[int]]:
+    """Merge results as they arrive; DONE on the queue means the workers are done"""
+    draft = None
+    pending: list[WorkerResult] = []  # results not merged yet
+    finished = False
+    while not finished:
+        batch = [await results.get()]
+        while not results.empty():
+            batch.append(results.get_nowait())
+        finished = DONE in batch
+        pending += [r for r in batch if r is not DONE]
+        if pending and not budget.exhausted:
+            merged = await merge_within_budget(user_input, draft, pending, budget)
+            if merged is not None:
+                draft, pending = merged, []
+
+    # results held back once the budget ran out get one last merge from the reserve
+    if pending and not budget.spent:
+        merged = await merge_within_budget(user_input, draft, pending, budget, use_reserve=True)
+        if merged is not None:
+            draft, pending = merged, []
+    return draft, sorted(r.subtask_id for r in pending)
+
+# pieces together
+
+async def process_request(
+    user_input: str,
+    concurrency: int = WORKER_CONCURRENCY,
+    max_tokens: int = 20_000,
+    max_seconds: float = 60.0,
+) -> OrchestratorResult:
+    """Main function implementing the orchestrator-workers workflow"""
+    logger.info("Processing request with orchestrator-workers")
+    budget = Budget(max_tokens=max_tokens, max_seconds=max_seconds, reserve_tokens=max_tokens // 5)
+
+    plan = await plan_subtasks(user_input, budget)
+    if plan is None:
+        return OrchestratorResult(
+            answer=None,
+            completed=[],
+            cancelled=[],
+            failed=[],
+            unmerged=[],
+            seconds=round(time.monotonic() - budget.started, 2),
+            tokens=budget.used_tokens,
+        )
+
+    queue: asyncio.Queue = asyncio.Queue()
+    results: asyncio.Queue = asyncio.Queue()
+    cancelled: list[int] = []
+    failed: list[int] = []
+    for subtask in plan.subtasks:
+        queue.put_nowait(subtask)
+    for _ in range(concurrency):
+        queue.put_nowait(None)  # one stop sentinel per worker
+
+    synthesis = asyncio.create_task(synthesizer(user_input, results, budget))
+    try:
+        await asyncio.gather(
+            *(worker(i, plan, queue, results, budget, cancelled, failed) for i in range(concurrency))
+        )
+        await results.put(DONE)
+        draft, unmerged = await synthesis
+    finally:
+        if not synthesis.done():
+            synthesis.cancel()
+
+    return OrchestratorResult(
+        answer=draft.answer if draft else None,
+        completed=draft.covered_subtasks if draft else [],
+        cancelled=sorted(cancelled),
+        failed=sorted(failed),
+        unmerged=unmerged,
+        seconds=round(time.monotonic() - budget.started, 2),
+        tokens=budget.used_tokens,
+    )
+
+# Test out
+
+async def run_example():
+    user_input = (
+        "We're planning a two-day offsite for 40 people next month. Draft an agenda, "
+        "list the vendors we need to contact (venue, catering, transport), estimate "
+        "the budget, and write the invite email for the team."
+    )
+    result = await process_request(user_input)
+    print(f"\nAnswer:\n{result.answer}")
+    print(f"\nCompleted subtasks: {result.completed}, cancelled: {result.cancelled}, failed: {result.failed}, unmerged: {result.unmerged}")
+    print(f"Took {result.seconds}s and {result.tokens} tokens")
+
+
+asyncio.run(run_example())
+
+logger.info(f"Step metrics: {metrics.summary()}")
+logger.info(f"Total cost: ${metrics.total_cost():.4f}")
+logger.info(f"Pool stats: {pool.stats()}")
@@ -47,6 +47,9 @@ import os
 import logging
 from dotenv import load_dotenv
 
+from model_cascade import ModelCascade
+from structured_repair import StructuredRepair
+
 # Set up logging configuration
 logging.basicConfig(
     level=logging.INFO,
@@ -65,6 +68,12 @@ client = AzureOpenAI(
 
 model = model=os.getenv("AZURE_DEPLOYMENT_NAME")
 
+# gate check call: small model first (see model_cascade.py)
+cascade = ModelCascade.from_env(client)
+
+# output repair for the later steps (see structured_repair.py)
+repairer = StructuredRepair(client, model)
+
 # Data Models
 
 class EventExtraction(BaseModel):
@@ -106,8 +115,7 @@ def extract_event_info(user_input: str) -> EventExtraction:
     today = datetime.now()
     date_context = f"Today is {today.strftime('%A, %B %d, %Y')}."
 
-    completion = client.beta.chat.completions.parse(
-        model=model,
+    result = cascade.parse(
         messages=[
             {
                 "role": "system",
@@ -116,22 +124,22 @@ def extract_event_info(user_input: str) -> EventExtraction:
             {"role": "user", "content": user_input},
         ],
         response_format=EventExtraction,
+        validate=lambda r: not r.is_calendar_event or r.description.strip(),  # step 2 needs a description
+        label=lambda r: r.is_calendar_event and r.confidence_score >= 0.7,
     )
-    result = completion.choices[0].message.parsed
     logger.info(
         f"Extraction complete - Is calendar event: {result.is_calendar_event}, Confidence: {result.confidence_score:.2f}"
     )
     return result
 
-def parse_event_details(description: str) -> EventDetails:
-    """Second LLM call to extract specific event details"""
+def parse_event_details(description: str) -> Optional[EventDetails]:
+    """Second LLM call to extract specific event details; None if refused or filtered"""
     logger.info("Starting event details parsing")
 
     today = datetime.now()
     date_context = f"Today is {today.strftime('%A, %B %d, %Y')}."
 
-    completion = client.beta.chat.completions.parse(
-        model=model,
+    result = repairer.parse(
         messages=[
             {
                 "role": "system",
@@ -141,19 +149,20 @@ def parse_event_details(description: str) -> EventDetails:
         ],
         response_format=EventDetails,
     )
-    result = completion.choices[0].message.parsed
+    if result is None:
+        logger.warning("Event details refused or filtered")
+        return None
     logger.info(
         f"Parsed event details - Name: {result.name}, Date: {result.date}, Duration: {result.duration_minutes}min"
     )
     logger.debug(f"Participants: {', '.join(result.participants)}")
     return result
 
-def generate_confirmation(event_details: EventDetails) -> EventConfirmation:
-    """Third LLM call to generate a confirmation message"""
+def generate_confirmation(event_details: EventDetails) -> Optional[EventConfirmation]:
+    """Third LLM call to generate a confirmation message; None if refused or filtered"""
     logger.info("Generating confirmation message")
 
-    completion = client.beta.chat.completions.parse(
-        model=model,
+    result = repairer.parse(
         messages=[
             {
                 "role": "system",
@@ -163,7 +172,9 @@ def generate_confirmation(event_details: EventDetails) -> EventConfirmation:
         ],
         response_format=EventConfirmation,
     )
-    result = completion.choices[0].message.parsed
+    if result is None:
+        logger.warning("Confirmation refused or filtered")
+        return None
     logger.info("Confirmation message generated successfully")
     return result
 
@@ -191,9 +202,13 @@ def process_calendar_request(user_input: str) -> Optional[EventConfirmation]:
 
     # Second LLM call: Get detailed event information
     event_details = parse_event_details(initial_extraction.description)
+    if event_details is None:
+        return None
 
     # Third LLM call: Generate confirmation
     confirmation = generate_confirmation(event_details)
+    if confirmation is None:
+        return None
 
     logger.info("Calendar request processing completed successfully")
     return confirmation
@@ -220,4 +235,7 @@ if result:
     if result.calendar_link:
         print(f"Calendar Link: {result.calendar_link}")
 else:
-    print("This doesn't appear to be a calendar event request.")
\ No newline at end of file
+    print("This doesn't appear to be a calendar event request.")
+
+logger.info(f"Cascade stats: {cascade.stats()}")
+logger.info(f"Repair stats: {repairer.stats()}")
@@ -45,9 +45,22 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 from openai import AzureOpenAI
 import os
+import re
 import logging
 from dotenv import load_dotenv
 
+from calendar_store import (
+    CalendarStore,
+    Event,
+    is_date_only,
+    is_time_only,
+    normalize_participant,
+    parse_datetime,
+    parse_time,
+)
+from model_cascade import ModelCascade
+from structured_repair import StructuredRepair, to_number
+
 # Set up logging configuration
 logging.basicConfig(
     level=logging.INFO,
@@ -66,6 +79,16 @@ client = AzureOpenAI(
 
 model = model=os.getenv("AZURE_DEPLOYMENT_NAME")
 
+# router calls: small model first (see model_cascade.py)
+cascade = ModelCascade.from_env(client)
+
+# events live in an indexed in-memory store, snapshotted to local disk
+store_path = os.getenv("CALENDAR_STORE_PATH", "calendar_store.pkl")
+store = CalendarStore.load(store_path) if os.path.exists(store_path) else CalendarStore()
+
+# extraction output repair (see structured_repair.py)
+repairer = StructuredRepair(client, model)
+
 # data model
 
 class CalendarRequestType(BaseModel):
@@ -110,12 +133,15 @@ class CalendarResponse(BaseModel):
 
 # functions / tools
 
+def routing_decision(result: CalendarRequestType) -> str:
+    """What the workflow does with a routing result, used to tune the cascade"""
+    return result.request_type if result.confidence_score >= 0.7 else "rejected"
+
 def route_calendar_request(user_input: str) -> CalendarRequestType:
     """Router LLM call to determine the type of calendar request"""
     logger.info("Routing calendar request")
 
-    completion = client.beta.chat.completions.parse(
-        model=model,
+    result = cascade.parse(
         messages=[
             {
                 "role": "system",
@@ -124,8 +150,8 @@ def route_calendar_request(user_input: str) -> CalendarRequestType:
             {"role": "user", "content": user_input},
         ],
         response_format=CalendarRequestType,
+        label=routing_decision,
     )
-    result = completion.choices[0].message.parsed
     logger.info(
         f"Request routed as: {result.request_type} with confidence: {result.confidence_score}"
     )
@@ -135,54 +161,158 @@ def handle_new_event(description: str) -> CalendarResponse:
     """Process a new event request"""
     logger.info("Processing new event request")
 
+    today = datetime.now()
+    date_context = f"Today is {today.strftime('%A, %B %d, %Y')}."
+
     # Get event details
-    completion = client.beta.chat.completions.parse(
-        model=model,
+    details = repairer.parse(
         messages=[
             {
                 "role": "system",
-                "content": "Extract details for creating a new calendar event.",
+                "content": f"{date_context} Extract details for creating a new calendar event.",
             },
             {"role": "user", "content": description},
         ],
         response_format=NewEventDetails,
     )
-    details = completion.choices[0].message.parsed
+    if details is None:
+        logger.warning("Event details refused or filtered")
+        return CalendarResponse(success=False, message="Couldn't extract the event details", calendar_link=None)
 
     logger.info(f"New event: {details.model_dump_json(indent=2)}")
 
+    try:
+        start = parse_datetime(details.date)
+    except ValueError:
+        logger.warning(f"Unparseable event date: {details.date}")
+        return CalendarResponse(
+            success=False,
+            message=f"Couldn't understand the date '{details.date}' for '{details.name}'",
+            calendar_link=None,
+        )
+
+    # Check conflicts for the participants, then store the event
+    conflicts = store.conflicts(start, details.duration_minutes, details.participants)
+    event = store.add(details.name, start, details.duration_minutes, details.participants)
+    store.flush()
+
+    message = f"Created new event '{details.name}' for {details.date} with {', '.join(details.participants)}"
+    if conflicts:
+        logger.warning(f"New event overlaps {len(conflicts)} existing events")
+        message += f" (overlaps with {', '.join(repr(c.name) for c in conflicts[:3])})"
+
     # Generate response
     return CalendarResponse(
         success=True,
-        message=f"Created new event '{details.name}' for {details.date} with {', '.join(details.participants)}",
-        calendar_link=f"calendar://new?event={details.name}",
+        message=message,
+        calendar_link=f"calendar://event/{event.id}",
     )
 
+def apply_changes(event: Event, changes: list[Change]) -> dict:
+    """Map free-form Change fields onto CalendarStore.update arguments"""
+    updates = {}
+    start = datetime.fromtimestamp(event.start)
+    end_value = None
+    for change in changes:
+        field = change.field.lower()
+        value = change.new_value.strip()
+        if set(re.findall(r"[a-z]+", field)) & {"end", "ends", "ending", "finish"}:
+            end_value = value  # becomes a duration once the new start is known
+        elif any(key in field for key in ("date", "time", "start")):
+            # a separate date or time only replaces that part of the start
+            base = updates.get("start", start)
+            if is_time_only(value):
+                clock = parse_time(value)
+                updates["start"] = base.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+            elif is_date_only(value):
+                updates["start"] = datetime.combine(parse_datetime(value).date(), base.time())
+            else:
+                updates["start"] = parse_datetime(value)
+        elif "duration" in field:
+            minutes = to_number(value, "duration_minutes")  # "1.5 hours" → 90
+            if minutes is None or minutes <= 0:
+                raise ValueError(f"Invalid duration: {change.new_value!r}")
+            updates["duration_minutes"] = round(minutes)
+        elif field in ("name", "title", "event_name"):
+            updates["name"] = change.new_value
+        else:
+            logger.warning(f"Unsupported change field: {change.field}")
+
+    if end_value is not None:
+        new_start = updates.get("start", start)
+        if is_time_only(end_value):
+            clock = parse_time(end_value)
+            end = new_start.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+        elif is_date_only(end_value):
+            end = datetime.combine(parse_datetime(end_value).date(), datetime.fromtimestamp(event.end).time())
+        else:
+            end = parse_datetime(end_value)
+        minutes = (end - new_start).total_seconds() / 60
+        if minutes <= 0:
+            raise ValueError(f"End {end_value!r} is not after the start")
+        updates["duration_minutes"] = round(minutes)
+    return updates
+
 def handle_modify_event(description: str) -> CalendarResponse:
     """Process an event modification request"""
     logger.info("Processing event modification request")
 
+    today = datetime.now()
+    date_context = f"Today is {today.strftime('%A, %B %d, %Y')}."
+
     # Get modification details
-    completion = client.beta.chat.completions.parse(
-        model=model,
+    details = repairer.parse(
         messages=[
             {
                 "role": "system",
-                "content": "Extract details for modifying an existing calendar event.",
+                "content": f"{date_context} Extract details for modifying an existing calendar event. Use ISO 8601 for new dates and times.",
             },
             {"role": "user", "content": description},
         ],
         response_format=ModifyEventDetails,
     )
-    details = completion.choices[0].message.parsed
+    if details is None:
+        logger.warning("Modification details refused or filtered")
+        return CalendarResponse(success=False, message="Couldn't extract the requested changes", calendar_link=None)
 
     logger.info(f"Modified event: {details.model_dump_json(indent=2)}")
 
+    # Resolve the event through the name index, no extra LLM call
+    event = store.find(details.event_identifier)
+    if event is None:
+        logger.warning(f"No event matches: {details.event_identifier}")
+        return CalendarResponse(
+            success=False,
+            message=f"Couldn't find an event matching '{details.event_identifier}'",
+            calendar_link=None,
+        )
+
+    try:
+        updates = apply_changes(event, details.changes)
+    except ValueError as e:
+        logger.warning(f"Invalid change value: {e}")
+        return CalendarResponse(
+            success=False,
+            message=f"Couldn't apply the changes to '{event.name}': {e}",
+            calendar_link=f"calendar://event/{event.id}",
+        )
+
+    removed = {normalize_participant(p) for p in details.participants_to_remove}
+    participants = [p for p in event.participants if p not in removed] + details.participants_to_add
+    if not updates and tuple(dict.fromkeys(normalize_participant(p) for p in participants)) == event.participants:
+        logger.warning(f"No supported changes for '{event.name}': {[c.field for c in details.changes]}")
+        return CalendarResponse(
+            success=False,
+            message=f"None of the requested changes to '{event.name}' are supported",
+            calendar_link=f"calendar://event/{event.id}",
+        )
+    event = store.update(event.id, participants=participants, **updates)
+
     # Generate response
     return CalendarResponse(
         success=True,
-        message=f"Modified event '{details.event_identifier}' with the requested changes",
-        calendar_link=f"calendar://modify?event={details.event_identifier}",
+        message=f"Modified event '{event.name}' with the requested changes",
+        calendar_link=f"calendar://event/{event.id}",
     )
 
 # pieces together
@@ -229,4 +359,9 @@ if result:
 invalid_input = "What's the weather like today?"
 result = process_calendar_request(invalid_input)
 if not result:
-    print("Request not recognized as a calendar operation")
\ No newline at end of file
+    print("Request not recognized as a calendar operation")
+
+logger.info(f"Cascade stats: {cascade.stats()}")
+logger.info(f"Repair stats: {repairer.stats()}")
+
+store.save(store_path)
@@ -0,0 +1,150 @@
+# ------------------------------------------------------------------------------
+# Benchmark: Full Retries vs Local Structured-Output Repair
+# ------------------------------------------------------------------------------
+
+# Runs the event details extraction from prompt-chaining-pattern.py against a
+# local stand-in deployment whose answers are sometimes malformed: wrapped in
+# code fences, with trailing commas, "60 minutes" instead of 60, participants
+# as one string, or cut off part-way. The same request stream is handled
+#
+#   1. the way the scripts did before: validate, and call again on failure
+#   2. with StructuredRepair: repair locally, re-ask only for missing fields
+#
+# and the report shows LLM calls, tokens, and the repair success rate.
+
+
+from pydantic import BaseModel, Field, ValidationError
+from openai import AzureOpenAI
+import json
+import logging
+import random
+
+from local_stand_in import LatencyProfile, StandInServer
+from structured_repair import StructuredRepair, response_format_for
+
+# Set up logging configuration
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+REQUESTS = 500
+MAX_ATTEMPTS = 3
+API_VERSION = "2024-08-01-preview"
+DEPLOYMENT = "gpt-4o"
+
+# data model
+
+class EventDetails(BaseModel):
+    """Second LLM call: Parse specific event details"""
+
+    name: str = Field(description="Name of the event")
+    date: str = Field(
+        description="Date and time of the event. Use ISO 8601 to format this value."
+    )
+    duration_minutes: int = Field(description="Expected duration in minutes")
+    participants: list[str] = Field(description="List of participants")
+
+# malformed stand-in
+
+answers = [
+    {"name": "Team Meeting", "date": "2025-03-11T14:00:00", "duration_minutes": 60, "participants": ["Alice", "Bob"]},
+    {"name": "Project Roadmap Review", "date": "2025-03-12T10:30:00", "duration_minutes": 90, "participants": ["Carol", "Dan", "Eve"]},
+    {"name": "Budget Sync", "date": "2025-03-14T09:00:00", "duration_minutes": 30, "participants": ["Frank"]},
+]
+
+def malform(answer: dict, rng: random.Random) -> str:
+    """A correct answer, or one of the ways real answers go wrong"""
+    roll = rng.random()
+    if roll < 0.6:
+        return json.dumps(answer)
+    if roll < 0.7:
+        return "```json\n" + json.dumps(answer, indent=2).replace("\n}", ",\n}") + "\n```"
+    if roll < 0.8:
+        return json.dumps(
+            {**answer, "duration_minutes": f"{answer['duration_minutes']} minutes", "participants": " and ".join(answer["participants"])}
+        )
+    if roll < 0.95:
+        text = json.dumps(answer)
+        return text[: rng.randrange(len(text) // 3, len(text) - 1)]  # cut off by max_tokens
+    return "I'm sorry, I can't format that."
+
+def make_responder(rng: random.Random):
+    def respond(deployment: str, body: dict) -> str:
+        answer = answers[hash(body["messages"][1]["content"]) % len(answers)]
+        schema = body["response_format"]["json_schema"]
+        if schema["name"].endswith("Missing"):  # targeted re-ask
+            return json.dumps({name: answer[name] for name in schema["schema"]["properties"]})
+        return malform(answer, rng)
+
+    return respond
+
+def make_messages(i: int) -> list:
+    return [
+        {"role": "system", "content": "Extract detailed event information."},
+        {"role": "user", "content": f"Request #{i}: schedule the meeting with the usual people"},
+    ]
+
+# functions
+
+def run_retries(client: AzureOpenAI) -> dict:
+    """Validate the whole answer and call again until it passes"""
+    calls = tokens = failed = 0
+    for i in range(REQUESTS):
+        for attempt in range(MAX_ATTEMPTS):
+            completion = client.chat.completions.create(
+                model=DEPLOYMENT, messages=make_messages(i), response_format=response_format_for(EventDetails)
+            )
+            calls += 1
+            tokens += completion.usage.total_tokens
+            try:
+                EventDetails.model_validate_json(completion.choices[0].message.content)
+                break
+            except ValidationError:
+                continue
+        else:
+            failed += 1
+    return {"calls": calls, "tokens": tokens, "failed": failed}
+
+def run_repair(client: AzureOpenAI) -> tuple[dict, StructuredRepair]:
+    """StructuredRepair: local repair first, then a re-ask for missing fields"""
+    repairer = StructuredRepair(client, DEPLOYMENT)
+    failed = 0
+    for i in range(REQUESTS):
+        try:
+            repairer.parse(make_messages(i), EventDetails)
+        except ValidationError:
+            failed += 1
+    calls = sum(step["calls"] for step in repairer.metrics.summary().values())
+    return {"calls": calls, "tokens": repairer.metrics.total_tokens(), "failed": failed}, repairer
+
+def main():
+    profile = LatencyProfile(median_ms=2, jitter=0.1)
+    results = {}
+    for label, run in (("full retries", run_retries), ("local repair", run_repair)):
+        server = StandInServer(DEPLOYMENT, profile, responder=make_responder(random.Random(5)), seed=1).start()
+        try:
+            client = AzureOpenAI(api_key="local", api_version=API_VERSION, azure_endpoint=server.endpoint)
+            results[label] = run(client)
+        finally:
+            server.stop()
+
+    repair_result, repairer = results["local repair"]
+    results["local repair"] = repair_result
+    for label, result in results.items():
+        print(
+            f"{label:<14} {result['calls']:>5} calls ({result['calls'] / REQUESTS:.2f}/request)  "
+            f"{result['tokens']:>7} tokens  {result['failed']} failed"
+        )
+    stats = repairer.stats()
+    print(f"repaired locally:      {stats['repaired_locally']}")
+    print(f"re-asked for fields:   {stats['reasked']}")
+    print(f"full retries:          {stats['full_retries']}")
+    print(f"repair success rate:   {stats['repair_success_rate']:.1%}")
+    print(f"full retries avoided:  {stats['full_retries_avoided']}")
+
+# Test out
+
+main()
@@ -0,0 +1,442 @@
+# ------------------------------------------------------------------------------
+# Local Repair for Structured Outputs
+# ------------------------------------------------------------------------------
+
+# Raw completion content ─────────────────────────┐
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 1: Clean Up the Text                    │
+# │  - Strip ```json fences and chatter around    │
+# │    the object, drop trailing commas           │
+# │  - Truncated output → cut back to the last    │
+# │    complete value and close the brackets      │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 2: Coerce to the Pydantic Model         │
+# │  - "60 minutes" → 60, "1 hour" → 60           │
+# │  - "yes" → True, "Alice, Bob" → [...]         │
+# │  - Missing Optional fields → None             │
+# │  - Fields that still don't validate are       │
+# │    dropped and reported as missing            │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Step 3: Targeted Re-ask                      │
+# │  - Only the missing fields, as a smaller      │
+# │    model built with create_model              │
+# │  - Merged with what was already repaired      │
+# └───────────────────────────────────────────────┘
+#                                                 ↓
+# ┌───────────────────────────────────────────────┐
+# │  Final Output:                                │
+# │  - Validated model instance                   │
+# │  - Full retry only if the repair gave nothing │
+# │    worth keeping                              │
+# │  - Refused or cut off by the content filter   │
+# │    → None, never repaired                     │
+# └───────────────────────────────────────────────┘
+
+
+from dataclasses import dataclass, field
+from typing import Any, Literal, Optional, Union, get_args, get_origin
+from pydantic import BaseModel, ValidationError, create_model
+import json
+import logging
+import re
+import time
+import types
+
+from llm_metrics import CallMetrics
+
+logger = logging.getLogger(__name__)
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+_NUMBER = re.compile(r"(-?\d+(?:\.\d+)?)\s*(%?)")
+_DURATION = re.compile(
+    r"(?:(\d+(?:\.\d+)?)\s*(?:h|hrs?|hours?))?\s*(?:and\s*)?(?:(\d+(?:\.\d+)?)\s*(?:m|mins?|minutes?))?"
+)
+_LIST_SEPARATORS = re.compile(r"\s*(?:,|;|\n|\band\b|&)\s*")
+_NULLS = {"", "null", "none", "n/a", "na", "unknown"}
+_TRUE = {"true", "yes", "y", "1", "on"}
+_FALSE = {"false", "no", "n", "0", "off"}
+
+# response format
+
+def response_format_for(model) -> dict:
+    """Strict json_schema response_format for a pydantic model, as .parse() would send"""
+    schema = model.model_json_schema()
+    _make_strict(schema)
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": schema, "strict": True},
+    }
+
+def _make_strict(node):
+    if isinstance(node, dict):
+        if node.get("type") == "object" and "properties" in node:
+            node["additionalProperties"] = False
+            node["required"] = list(node["properties"])
+        if node.get("default", ...) is None:
+            del node["default"]
+        for value in node.values():
+            _make_strict(value)
+    elif isinstance(node, list):
+        for item in node:
+            _make_strict(item)
+
+# step 1: text
+
+def extract_json(text: str) -> str:
+    """The JSON object in a reply, without code fences or surrounding chatter"""
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    return text[start:] if start >= 0 else text
+
+def close_json(text: str) -> str:
+    """
+    Balance a JSON document that was cut off and drop trailing commas. A
+    truncated document is cut back to the last complete value outside any
+    array, so a partial string, number or list never passes for a whole one;
+    whatever was cut shows up as missing fields instead.
+    """
+    out: list[str] = []
+    stack: list[str] = []
+    cuts: list[tuple[int, str]] = []  # (length of out, closers) where the prefix is complete
+    in_string = escape = False
+
+    def mark():
+        if all(closer == "}" for closer in stack):
+            cuts.append((len(out), "".join(reversed(stack))))
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+            mark()
+            continue
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()  # trailing comma
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                break  # ignore anything after the document
+            mark()
+            continue
+        elif ch == ",":
+            mark()
+        out.append(ch)
+
+    if not stack and not in_string:
+        return "".join(out)
+    for length, closers in reversed(cuts):
+        candidate = "".join(out[:length]).rstrip().rstrip(",") + closers
+        try:
+            json.loads(candidate)
+            return candidate
+        except ValueError:
+            continue
+    return "".join(out)
+
+# step 2: types
+
+def _key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.strip().lower()).strip("_")
+
+def _is_optional(annotation) -> bool:
+    return get_origin(annotation) in (Union, types.UnionType) and type(None) in get_args(annotation)
+
+def to_number(text: str, name: str = "") -> Optional[float]:
+    """
+    A bare number or percentage; fields named *minute* also read "1.5 hours"
+    or "1h 30m" as minutes. Anything else ("2 weeks", "30-45", "1/10") is None.
+    """
+    text = text.strip().lower().replace(",", "")
+    match = _NUMBER.fullmatch(text)
+    if match:
+        number = float(match.group(1))
+        return number / 100 if match.group(2) else number
+    if "minute" in name:
+        match = _DURATION.fullmatch(text)
+        if match and (match.group(1) or match.group(2)):
+            return float(match.group(1) or 0) * 60 + float(match.group(2) or 0)
+    return None
+
+def coerce_value(value: Any, annotation, name: str = "") -> Any:
+    """Best-effort conversion of one value to a field annotation; unknown cases are left alone"""
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin in (Union, types.UnionType):
+        if value is None or (isinstance(value, str) and value.strip().lower() in _NULLS and type(None) in args):
+            return None
+        for arg in args:
+            if arg is not type(None):
+                return coerce_value(value, arg, name)
+    if origin is Literal:
+        if value in args:
+            return value
+        wanted = _key(str(value))
+        return next((arg for arg in args if _key(str(arg)) == wanted), value)
+    if origin is list or annotation is list:
+        if isinstance(value, str):
+            value = [] if value.strip().lower() in _NULLS else [v for v in _LIST_SEPARATORS.split(value) if v]
+        elif not isinstance(value, list):
+            value = [value]
+        item = args[0] if args else Any
+        return [coerce_value(v, item, name) for v in value]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel) and isinstance(value, dict):
+        return coerce_fields(value, annotation)
+    if annotation is bool and isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        text = str(value).strip().lower()
+        return True if text in _TRUE else False if text in _FALSE else value
+    if annotation in (int, float) and isinstance(value, str):
+        number = to_number(value, name)
+        if number is None:
+            return value
+        value = number
+    if annotation is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    if annotation is int and isinstance(value, float):
+        return round(value)
+    if annotation is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if annotation is str and isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return value
+
+def coerce_fields(data: dict, model) -> dict:
+    """Match keys to the model's fields, coerce their values and fill missing Optional fields"""
+    fields = model.model_fields
+    by_key = {_key(name): name for name in fields}
+    out = {}
+    for key, value in data.items():
+        name = key if key in fields else by_key.get(_key(key))
+        if name is not None:
+            out[name] = coerce_value(value, fields[name].annotation, name)
+    for name, info in fields.items():
+        if name not in out and info.is_required() and _is_optional(info.annotation):
+            out[name] = None
+    return out
+
+# repair
+
+@dataclass
+class RepairResult:
+    """Outcome of repairing one completion locally"""
+
+    parsed: Optional[BaseModel]  # validated instance, None if fields are missing
+    data: dict  # fields that did validate
+    missing: list[str] = field(default_factory=list)
+    repaired: bool = False  # the raw content was not valid as-is
+
+def repair(content: Optional[str], response_format) -> RepairResult:
+    """Turn raw completion content into the model, or report which fields are still missing"""
+    content = content or ""
+    try:
+        return RepairResult(response_format.model_validate_json(content), {})
+    except (ValidationError, ValueError):
+        pass
+
+    try:
+        data = json.loads(close_json(extract_json(content)))
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    data = coerce_fields(data, response_format)
+
+    while True:
+        try:
+            return RepairResult(response_format.model_validate(data), data, repaired=True)
+        except ValidationError as e:
+            broken = {error["loc"][0] for error in e.errors() if error["loc"]}
+            present = broken & data.keys()
+            if not present:
+                missing = [name for name in response_format.model_fields if name in broken]
+                return RepairResult(None, data, missing, repaired=True)
+            for name in present:
+                data.pop(name)  # re-ask for it rather than guess
+
+def missing_model(response_format, missing: list[str]):
+    """Smaller model with just the missing fields, for a targeted re-ask"""
+    fields = response_format.model_fields
+    return create_model(
+        f"{response_format.__name__}Missing",
+        __doc__=response_format.__doc__,
+        **{name: (fields[name].annotation, fields[name]) for name in missing},
+    )
+
+def reask_messages(messages: list, result: RepairResult) -> list:
+    """Original conversation plus the partial answer and a request for the missing fields only"""
+    return messages + [
+        {"role": "assistant", "content": json.dumps(result.data)},
+        {
+            "role": "user",
+            "content": f"Your answer was incomplete. Reply with only these fields: {', '.join(result.missing)}.",
+        },
+    ]
+
+# client wrapper
+
+class StructuredRepair:
+    """chat.completions with local repair, a targeted re-ask, and a full retry as the last resort"""
+
+    def __init__(self, client=None, model: Optional[str] = None, pool=None):
+        self.client = client
+        self.model = model
+        self.pool = pool  # optional DeploymentPool, async calls only; each call goes through it on its own
+        self.metrics = CallMetrics()
+        self.calls = 0
+        self.clean = 0
+        self.repaired = 0  # fixed locally, no extra call
+        self.reasked = 0  # fixed with a re-ask for the missing fields
+        self.full_retries = 0
+        self.failed = 0
+        self.refusals = 0
+
+    def parse(self, messages: list, response_format, **kwargs):
+        """Synchronous drop-in for client.beta.chat.completions.parse(...).choices[0].message.parsed"""
+        self.calls += 1
+        completion = self._create("first", messages, response_format, kwargs)
+        first = self._first(completion, response_format)
+        if first is None or first.parsed is not None:
+            return first and first.parsed
+
+        if self._worth_reasking(first, response_format):
+            subset = missing_model(response_format, first.missing)
+            completion = self._create("reask", reask_messages(messages, first), subset, kwargs)
+            merged = self._merge(first, completion, subset, response_format)
+            if merged is not None:
+                return merged
+
+        self.full_retries += 1
+        completion = self._create("retry", messages, response_format, kwargs)
+        return self._last(completion, response_format)
+
+    async def aparse(self, messages: list, response_format, **kwargs):
+        """Async version; with a pool every call is balanced (and hedged) separately"""
+        self.calls += 1
+        completion = await self._acreate("first", messages, response_format, kwargs)
+        first = self._first(completion, response_format)
+        if first is None or first.parsed is not None:
+            return first and first.parsed
+
+        if self._worth_reasking(first, response_format):
+            subset = missing_model(response_format, first.missing)
+            completion = await self._acreate("reask", reask_messages(messages, first), subset, kwargs)
+            merged = self._merge(first, completion, subset, response_format)
+            if merged is not None:
+                return merged
+
+        self.full_retries += 1
+        completion = await self._acreate("retry", messages, response_format, kwargs)
+        return self._last(completion, response_format)
+
+    def _create(self, step, messages, response_format, kwargs):
+        start = time.perf_counter()
+        completion = self.client.chat.completions.create(
+            model=self.model, messages=messages, response_format=response_format_for(response_format), **kwargs
+        )
+        self.metrics.record(step, time.perf_counter() - start, completion.usage)
+        return completion
+
+    async def _acreate(self, step, messages, response_format, kwargs):
+        format_param = response_format_for(response_format)
+        start = time.perf_counter()
+        if self.pool is not None:
+            completion = await self.pool.call(
+                lambda client, model: client.chat.completions.create(
+                    model=model, messages=messages, response_format=format_param, **kwargs
+                )
+            )
+        else:
+            completion = await self.client.chat.completions.create(
+                model=self.model, messages=messages, response_format=format_param, **kwargs
+            )
+        self.metrics.record(step, time.perf_counter() - start, completion.usage)
+        return completion
+
+    def _refused(self, completion, response_format) -> bool:
+        """Refusals and content-filtered output are never repaired into an answer"""
+        choice = completion.choices[0]
+        if getattr(choice.message, "refusal", None):
+            reason = choice.message.refusal
+        elif choice.finish_reason == "content_filter":
+            reason = "output stopped by the content filter"
+        else:
+            return False
+        self.refusals += 1
+        logger.warning(f"Model refused {response_format.__name__}: {reason}")
+        return True
+
+    def _first(self, completion, response_format) -> Optional[RepairResult]:
+        if self._refused(completion, response_format):
+            return None
+        message = completion.choices[0].message
+        result = repair(message.content, response_format)
+        if result.parsed is not None:
+            if result.repaired:
+                self.repaired += 1
+                logger.info(f"Repaired {response_format.__name__} locally ({completion.choices[0].finish_reason})")
+            else:
+                self.clean += 1
+        return result
+
+    def _worth_reasking(self, result: RepairResult, response_format) -> bool:
+        """A re-ask only pays off if part of the answer survived"""
+        return bool(result.data and result.missing) and len(result.missing) < len(response_format.model_fields)
+
+    def _merge(self, first: RepairResult, completion, subset, response_format) -> Optional[BaseModel]:
+        if completion.choices[0].finish_reason == "content_filter":
+            return None
+        answer = repair(completion.choices[0].message.content, subset)
+        if answer.parsed is None:
+            return None
+        try:
+            merged = response_format.model_validate({**first.data, **answer.parsed.model_dump()})
+        except ValidationError:
+            return None
+        self.reasked += 1
+        logger.info(f"Re-asked {response_format.__name__} for {first.missing} instead of the full prompt")
+        return merged
+
+    def _last(self, completion, response_format):
+        if self._refused(completion, response_format):
+            return None
+        result = repair(completion.choices[0].message.content, response_format)
+        if result.parsed is None:
+            self.failed += 1
+            return response_format.model_validate(result.data)  # raises the ValidationError
+        return result.parsed
+
+    def stats(self) -> dict:
+        """Repair success rate and the full retries it saved"""
+        needed = self.repaired + self.reasked + self.full_retries
+        return {
+            "calls": self.calls,
+            "clean": self.clean,
+            "repaired_locally": self.repaired,
+            "reasked": self.reasked,
+            "full_retries": self.full_retries,
+            "failed": self.failed,
+            "refusals": self.refusals,
+            "repair_success_rate": round((self.repaired + self.reasked) / needed, 3) if needed else 1.0,
+            "full_retries_avoided": self.repaired + self.reasked,
+            "steps": self.metrics.summary(),
+        }